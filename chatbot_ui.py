@@ -9,11 +9,18 @@ Date: November 2025
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import plotly.express as px
+import plotly.graph_objects as go
 from datetime import datetime
+import hashlib
+import io
+import json
 import os
-import re
+import threading
+from intent_router import AnswerCache, IntentRouter, SALES_INTENTS
 
 # ----------------------------------------------------------------------
 # Page Configuration & Styling
@@ -86,15 +93,21 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# The dataset is shared read-only by every session; copy-on-write keeps
+# per-session derived frames from ever writing into the shared buffers.
+pd.options.mode.copy_on_write = True
+
 # ----------------------------------------------------------------------
 # Session State Initialization
+# (per-session state is limited to navigation, filters and chat history;
+#  the dataset itself lives in a process-wide cache, see load_shared_dataset)
 # ----------------------------------------------------------------------
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'data_loaded' not in st.session_state:
     st.session_state.data_loaded = False
-if 'sales_data' not in st.session_state:
-    st.session_state.sales_data = None
+if 'data_source' not in st.session_state:
+    st.session_state.data_source = None
 if 'active_tab' not in st.session_state:
     st.session_state.active_tab = "chat"
 if 'pending_query' not in st.session_state:
@@ -104,91 +117,513 @@ if 'top_x_requested' not in st.session_state:
 if 'dashboard_section' not in st.session_state:
     st.session_state.dashboard_section = "overview"
 
+# ----------------------------------------------------------------------
+# Data Storage
+# ----------------------------------------------------------------------
+ARROW_SNAPSHOT_FILE = "akij_sales_data.arrow"  # Uncompressed Arrow IPC snapshot, memory-mapped and shared
+DATA_STORE_DIR = "akij_sales_data"      # Parquet store written by sales_agents (partitioned by month)
+DATA_CSV_FILE = "akij_sales_data.csv"   # Legacy CSV export, used when the store is missing
+STORE_FEED_FILE = "_feed.json"          # feed watermark inside the store ('_' files are not data)
+STORE_PARTITION_COLUMN = "date_month"
+FEED_DIGEST_BYTES = 64 * 1024  # head of the CSV feed hashed to tell an append from a rewrite
+
+# Columns the chat handlers and dashboard views actually read
+UI_COLUMNS = [
+    'date', 'product', 'business_division', 'region', 'customer_segment',
+    'revenue', 'profit', 'profit_margin'
+]
+
+# Compact in-memory schema: categorical dimension columns, float32 per-row ratios.
+# The dictionaries are not repeated here: snapshot/store columns arrive dictionary-encoded
+# with the generator's SalesSchema categories, and CSV rows reuse the dataset's own.
+DICTIONARY_COLUMNS = ['product', 'business_division', 'region', 'customer_segment', 'sales_channel']
+SCHEMA_DTYPES = {'profit_margin': 'float32', 'unit_price': 'float32', 'quantity': 'int16'}
+
+def apply_schema(df: pd.DataFrame, categories: dict = None) -> pd.DataFrame:
+    """
+    Convert a loaded frame to the compact schema (no-op for columns already converted).
+    Dictionary columns take the given categories (the dataset's current ones) with any
+    unseen values (e.g. a new region) appended rather than turned into NaN, so every row
+    still lands in its breakdowns; without categories, a column's own values are used.
+    """
+    categories = categories or {}
+    converted = {}
+    for col in DICTIONARY_COLUMNS:
+        if col not in df.columns or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        known = categories.get(col, pd.Index([], dtype=object))
+        unseen = pd.Index(df[col].dropna().unique()).difference(known)
+        converted[col] = df[col].astype(pd.CategoricalDtype(known.append(unseen.sort_values())))
+    for col, dtype in SCHEMA_DTYPES.items():
+        if col in df.columns:
+            converted[col] = df[col].astype(dtype)
+    return df.assign(**converted)
+
+def read_sales_store(columns: list = None, start=None, end=None) -> pd.DataFrame:
+    """Read the Parquet store with column projection and optional date-range pruning (both days inclusive)"""
+    filters = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        filters += [(STORE_PARTITION_COLUMN, '>=', start.strftime('%Y-%m')), ('date', '>=', start)]
+    if end is not None:
+        end = pd.Timestamp(end).normalize()
+        # Timestamps carry a time of day: everything before the next midnight is on `end`
+        filters += [(STORE_PARTITION_COLUMN, '<=', end.strftime('%Y-%m')),
+                    ('date', '<', end + pd.Timedelta(days=1))]
+    df = pd.read_parquet(DATA_STORE_DIR, columns=columns, filters=filters or None)
+    return df.drop(columns=[STORE_PARTITION_COLUMN], errors='ignore')
+
 # ----------------------------------------------------------------------
 # Helper Functions
 # ----------------------------------------------------------------------
+# Dimensions with running (mergeable) aggregates kept alongside the dataset
+AGGREGATE_DIMENSIONS = ['business_division', 'product', 'region', 'customer_segment', 'date']
+
+def build_aggregates(df: pd.DataFrame) -> dict:
+    """Per-dimension partial sums and counts; merging two of these equals aggregating the union"""
+    measures = pd.DataFrame({
+        'revenue': df['revenue'],
+        'profit': df['profit'],
+        'margin_sum': df['profit_margin'].astype('float64'),  # float32 in the compact schema
+    })
+    aggregates = {'_total': measures.sum().to_frame().T.assign(count=len(df))}
+    for dim in AGGREGATE_DIMENSIONS:
+        key = df[dim].dt.normalize() if dim == 'date' else df[dim]
+        grouped = measures.groupby(key, observed=True)
+        aggregates[dim] = grouped.sum().assign(count=grouped.size())
+    return aggregates
+
+def merge_aggregates(current: dict, delta: dict) -> dict:
+    """Fold a batch's aggregates into the running ones; cost is O(groups), not O(rows)"""
+    merged = {'_total': current['_total'].add(delta['_total'], fill_value=0)}
+    for dim in AGGREGATE_DIMENSIONS:
+        merged[dim] = current[dim].add(delta[dim], fill_value=0)
+    return merged
+
+STAT_MEASURES = ('revenue', 'profit', 'profit_margin')
+
+def dimension_stats(data: pd.DataFrame, dim, measures=STAT_MEASURES, nunique=()) -> pd.DataFrame:
+    """
+    Sum and mean of each measure, row count and distinct counts per value of `dim`
+    (a column or list of columns), from one groupby: the keys are factorized once
+    instead of once per aggregate. Columns: '<measure>_sum', '<measure>_mean',
+    'count' and '<column>_nunique' for each column in nunique.
+    """
+    # float32 columns are averaged in float64 so displayed figures keep full precision
+    narrow = [col for col in measures if data[col].dtype == 'float32']
+    if narrow:
+        data = data.assign(**{col: data[col].astype('float64') for col in narrow})
+    spec = {f'{col}_{fn}': (col, fn) for col in measures for fn in ('sum', 'mean')}
+    spec['count'] = (measures[0], 'size')
+    spec.update({f'{col}_nunique': (col, 'nunique') for col in nunique})
+    return data.groupby(dim, observed=True).agg(**spec)
+
+def align_categories(*frames: pd.DataFrame) -> list:
+    """
+    Give every frame the same categorical dtypes: each dictionary column's categories are
+    widened to the union (first frame's order, then new values), so concatenating keeps
+    the columns categorical. Returns new frames; the inputs are not modified.
+    """
+    frames = list(frames)
+    for col in frames[0].columns:
+        dtypes = [frame[col].dtype for frame in frames]
+        if not all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+        categories = dtypes[0].categories
+        for dtype in dtypes[1:]:
+            categories = categories.append(dtype.categories.difference(categories))
+        union = pd.CategoricalDtype(categories)
+        frames = [frame if frame[col].dtype == union else frame.assign(**{col: frame[col].astype(union)})
+                  for frame in frames]
+    return frames
+
+def frame_categories(frame: pd.DataFrame) -> dict:
+    """Categories of each categorical column, as apply_schema takes them"""
+    return {col: frame[col].dtype.categories for col in frame.columns
+            if isinstance(frame[col].dtype, pd.CategoricalDtype)}
+
+def feed_digest(path: str, length: int) -> tuple:
+    """(n, sha256 of the first n bytes) of the feed, n = min(length, FEED_DIGEST_BYTES).
+    Appends leave it unchanged; rewriting the file changes it."""
+    with open(path, 'rb') as f:
+        head = f.read(min(length, FEED_DIGEST_BYTES))
+    return len(head), hashlib.sha256(head).hexdigest()
+
+class SalesDataset:
+    """
+    Process-wide dataset shared by every session
+    - base: the loaded snapshot (memory-mapped for the Arrow file); never modified
+    - appended feed rows are kept as separate chunks beside the base, so an append
+      costs O(new rows); `frame` concatenates them lazily, once per version, on read
+    - aggregates: running per-dimension sums, updated incrementally on append
+    - version: bumped on every append/reload, so caches keyed on it invalidate; each
+      materialized frame carries its version in frame.attrs['dataset_version']
+    - summary: sidebar/KPI figures, recomputed only when the data changes
+    - source: (path, file version) it was loaded from; tagged on every frame too
+    - feed watermark: the CSV feed's path and the byte offset up to which its rows are
+      held, with its inode, mtime and head digest to detect a rewritten (not appended)
+      file. Taken from the feed itself (CSV source) or recorded by the snapshot/store
+      writer (none recorded: no feed is followed). A recorded watermark is trusted once
+      the feed has matched it; until then a mismatching file is another feed, not a
+      rewrite, and never replaces the loaded rows.
+    """
+
+    def __init__(self, frame: pd.DataFrame, source: tuple, feed_path: str = None,
+                 feed_offset: int = None, feed_digest: tuple = None, feed_verified: bool = False):
+        self.version = 0
+        self.source = source
+        self.feed_path = feed_path
+        self.feed_offset = feed_offset
+        self.feed_digest = feed_digest
+        self.feed_verified = feed_verified
+        self.feed_mismatch = False
+        self.feed_inode = None
+        self.feed_mtime = None
+        self._lock = threading.Lock()
+        self._reset(frame)
+
+    def _tag(self, frame: pd.DataFrame):
+        frame.attrs['dataset_source'] = self.source
+        frame.attrs['dataset_version'] = self.version
+
+    def _reset(self, frame: pd.DataFrame):
+        self.base = frame
+        self.categories = frame_categories(frame)
+        self._chunks = []
+        self._frame = frame
+        self._tag(frame)
+        self.rows = len(frame)
+        self.aggregates = build_aggregates(frame)
+        self.min_date = frame['date'].min()
+        self.max_date = frame['date'].max()
+        self._refresh_summary()
+
+    def _refresh_summary(self):
+        summary = get_analytics_summary(self.aggregates)
+        summary.update({
+            'records': self.rows,
+            'date_span_days': (self.max_date - self.min_date).days,
+            'products': len(self.aggregates['product']),
+            'divisions': len(self.aggregates['business_division']),
+            'division_margins': self.aggregates['business_division']['margin_sum']
+                                / self.aggregates['business_division']['count'],
+        })
+        self.summary = summary
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Base rows plus appended chunks (read-only); concatenated on the first read after an append"""
+        with self._lock:
+            if self._frame is None:
+                parts = align_categories(self.base, *self._chunks)
+                self._frame = pd.concat(parts, ignore_index=True)
+                self._tag(self._frame)
+            return self._frame
+
+    def _same_feed(self, path: str) -> bool:
+        """False when the feed was rewritten since the watermark was taken"""
+        stat = os.stat(path)
+        if stat.st_size < self.feed_offset:
+            return False
+        if self.feed_inode is not None and stat.st_ino != self.feed_inode:
+            return False
+        if self.feed_mtime is not None and stat.st_mtime < self.feed_mtime:
+            return False
+        return self.feed_digest is None or feed_digest(path, self.feed_digest[0]) == self.feed_digest
+
+    def _remember_feed(self, path: str):
+        stat = os.stat(path)
+        self.feed_inode, self.feed_mtime = stat.st_ino, stat.st_mtime
+        if self.feed_digest is None:
+            self.feed_digest = feed_digest(path, self.feed_offset)
+
+    def ingest_feed(self) -> int:
+        """
+        Append rows added to the CSV feed since the last watermark; returns rows appended.
+        If the feed was rewritten instead, the dataset is reloaded from it in full; if it
+        never matched the recorded watermark, nothing is read (feed_mismatch is set).
+        """
+        path = self.feed_path
+        if path is None or not os.path.exists(path):
+            return 0
+        with self._lock:
+            if not self._same_feed(path):
+                self.feed_mismatch = not self.feed_verified
+                return 0 if self.feed_mismatch else self._reload_feed(path)
+            self.feed_verified, self.feed_mismatch = True, False
+            with open(path, 'rb') as f:
+                header = f.readline()
+                f.seek(self.feed_offset)
+                start = f.tell()
+                raw = f.read()
+
+            tail = self._parse_feed(header, raw)
+            # Only complete lines are consumed; a partially written last line is read next time
+            self.feed_offset = start + raw.rfind(b'\n') + 1
+            self._remember_feed(path)
+
+            if tail.empty:
+                return 0
+            tail = apply_schema(tail, self.categories)
+            self.categories.update(frame_categories(tail))
+            self._chunks.append(tail)
+            self._frame = None
+            self.rows += len(tail)
+            self.aggregates = merge_aggregates(self.aggregates, build_aggregates(tail))
+            self.min_date = min(self.min_date, tail['date'].min())
+            self.max_date = max(self.max_date, tail['date'].max())
+            self.version += 1
+            self._refresh_summary()
+            return len(tail)
+
+    def _reload_feed(self, path: str) -> int:
+        """Replace all rows with the (rewritten) feed's contents; returns rows loaded"""
+        with open(path, 'rb') as f:
+            raw = f.read()
+        complete = raw[:raw.rfind(b'\n') + 1]
+        frame = apply_schema(pd.read_csv(io.BytesIO(complete), usecols=UI_COLUMNS, parse_dates=['date']),
+                             self.categories)
+        self.feed_offset, self.feed_digest = len(complete), feed_digest(path, len(complete))
+        self._remember_feed(path)
+        self.version += 1
+        self._reset(frame)
+        return len(frame)
+
+    @staticmethod
+    def _parse_feed(header: bytes, raw: bytes) -> pd.DataFrame:
+        """Parse complete CSV lines of the feed tail (UI columns only)"""
+        complete = raw[:raw.rfind(b'\n') + 1]
+        if not complete.strip():
+            return pd.DataFrame(columns=UI_COLUMNS).astype({'date': 'datetime64[ns]'})
+        return pd.read_csv(io.BytesIO(header + complete), usecols=UI_COLUMNS, parse_dates=['date'])
+
+class StaleDataSource(Exception):
+    """The data source was replaced while (or before) it was loaded under an older version"""
+
+def source_version(path: str):
+    """Version of a data source file, or None if it is gone.
+    Snapshot/store versions are their mtime. The CSV feed's version is its inode, not
+    its mtime: appends are ingested in place, and a rewrite is detected by ingest_feed."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return float(stat.st_ino) if path == DATA_CSV_FILE else stat.st_mtime
+
+def find_data_source():
+    """Best available data source as (path, version), or None"""
+    for path in (ARROW_SNAPSHOT_FILE, DATA_STORE_DIR, DATA_CSV_FILE):
+        version = source_version(path)
+        if version is not None:
+            return path, version
+    return None
+
+def feed_watermark(meta: dict, rows: int) -> dict:
+    """SalesDataset feed arguments from the watermark a snapshot/store was written with;
+    none if it has no watermark or the watermark counts other rows than were loaded"""
+    if 'feed_path' not in meta or int(meta['feed_rows']) != rows:
+        return {}
+    return {
+        'feed_path': meta['feed_path'],
+        'feed_offset': int(meta['feed_offset']),
+        'feed_digest': (int(meta['feed_digest_bytes']), meta['feed_digest']),
+    }
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_shared_dataset(path: str, version: float, columns: tuple) -> SalesDataset:
+    """
+    Load the dataset once per server process and share it across all sessions.
+    The Arrow snapshot is memory-mapped, so numeric columns are zero-copy views
+    of the page cache; `version` (file mtime) makes a regenerated file reload.
+    The snapshot/store record how much of the CSV feed they already hold, so the
+    first refresh only parses rows appended after it. The file is re-checked after
+    loading: contents of a newer version are never cached under an older key.
+    """
+    columns = list(columns)
+    if path == ARROW_SNAPSHOT_FILE:
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        meta = {key.decode()[len('akij.'):]: value.decode()
+                for key, value in (table.schema.metadata or {}).items() if key.startswith(b'akij.')}
+        frame = apply_schema(table.select(columns).to_pandas(split_blocks=True))
+        dataset = SalesDataset(frame, (path, version), **feed_watermark(meta, len(frame)))
+    elif path == DATA_STORE_DIR:
+        meta_path = os.path.join(path, STORE_FEED_FILE)
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        frame = apply_schema(read_sales_store(columns))
+        dataset = SalesDataset(frame, (path, version), **feed_watermark(meta, len(frame)))
+    else:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        complete = raw[:raw.rfind(b'\n') + 1]
+        frame = apply_schema(pd.read_csv(io.BytesIO(complete), usecols=columns, parse_dates=['date']))
+        dataset = SalesDataset(frame, (path, version), feed_path=path, feed_offset=len(complete),
+                               feed_digest=feed_digest(path, len(complete)), feed_verified=True)
+    if source_version(path) != version:
+        raise StaleDataSource(path)
+    return dataset
+
+def get_dataset() -> SalesDataset:
+    """The shared dataset for the source this session loaded; if that file was replaced
+    (its version is gone), the session is re-pointed to the current source"""
+    for _ in range(3):
+        path, version = st.session_state.data_source
+        try:
+            return load_shared_dataset(path, version, tuple(UI_COLUMNS))
+        except StaleDataSource:
+            source = find_data_source()
+            if source is None:
+                raise
+            st.session_state.data_source = source
+    raise StaleDataSource(path)
+
+def get_data() -> pd.DataFrame:
+    """The shared transaction frame (read-only)"""
+    return get_dataset().frame
+
+def dataset_fingerprint(data: pd.DataFrame = None) -> tuple:
+    """
+    Identifies the data behind a cached answer or figure: source, its file version, and
+    appends ingested. Given a frame, its own tags are used, so a feed append or a source
+    change after the frame was read can never pair old rows with the new version.
+    """
+    if data is None:
+        dataset = get_dataset()
+        return (*dataset.source, dataset.version)
+    return (*data.attrs['dataset_source'], data.attrs['dataset_version'])
+
 def load_data() -> pd.DataFrame:
-    """Load and cache sales data"""
-    file_path = "akij_sales_data.csv"
-    if not os.path.exists(file_path):
-        st.error("Data file `akij_sales_data.csv` not found. Please generate it first.")
+    """Point this session at the latest data source and ingest any new feed rows.
+    A refresh costs O(new rows): the base data is loaded once per process."""
+    source = find_data_source()
+    if source is None:
+        st.error(f"No sales data found (`{ARROW_SNAPSHOT_FILE}`, `{DATA_STORE_DIR}/` or `{DATA_CSV_FILE}`). "
+                 "Please generate it first.")
         return None
     try:
-        df = pd.read_csv(file_path)
-        df['date'] = pd.to_datetime(df['date'])
-        st.session_state.sales_data = df
+        st.session_state.data_source = source
+        dataset = get_dataset()
+        appended = dataset.ingest_feed()
+        if appended:
+            st.toast(f"Appended {appended:,} new transactions")
+        if dataset.feed_mismatch:
+            st.warning(f"`{dataset.feed_path}` does not match the data in `{dataset.source[0]}`; "
+                       "its rows are not ingested until the data is regenerated.")
+        # Answers computed on superseded versions of this source can never be hit again
+        current = dataset_fingerprint()
+        get_answer_cache().prune(lambda fp: fp[0] == current[0] and fp != current)
         st.session_state.data_loaded = True
-        return df
+        return dataset.frame
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
 
-def get_analytics_summary(data: pd.DataFrame) -> dict:
-    """Generate key performance summary"""
+def get_analytics_summary(aggregates: dict) -> dict:
+    """Generate key performance summary from the running aggregates"""
+    total = aggregates['_total'].iloc[0]
     return {
-        'total_revenue': data['revenue'].sum(),
-        'total_profit': data['profit'].sum(),
-        'avg_margin': data['profit_margin'].mean(),
-        'total_transactions': len(data),
-        'top_division': data.groupby('business_division')['revenue'].sum().idxmax(),
-        'top_product': data.groupby('product')['revenue'].sum().idxmax(),
-        'top_region': data.groupby('region')['revenue'].sum().idxmax(),
+        'total_revenue': total['revenue'],
+        'total_profit': total['profit'],
+        'avg_margin': total['margin_sum'] / total['count'],
+        'total_transactions': int(total['count']),
+        'top_division': aggregates['business_division']['revenue'].idxmax(),
+        'top_product': aggregates['product']['revenue'].idxmax(),
+        'top_region': aggregates['region']['revenue'].idxmax(),
     }
 
-def create_dashboard_overview(data: pd.DataFrame):
-    """Render main dashboard overview"""
-    col1, col2 = st.columns(2)
-
+# ----------------------------------------------------------------------
+# Dashboard Sections (figures/tables built once per section, parameters and
+# dataset version; renderers below only lay them out)
+# ----------------------------------------------------------------------
+def build_overview_section(data: pd.DataFrame) -> dict:
     # Revenue by Business Division
-    with col1:
-        fig = px.bar(
-            data.groupby('business_division')['revenue'].sum().reset_index()
-                .sort_values('revenue', ascending=False),
-            x='business_division', y='revenue',
-            title='Revenue by Business Division',
-            color='business_division', text_auto='.2s'
-        )
-        fig.update_layout(showlegend=False, height=420)
-        # Fix 1: Deprecation replacement (use_container_width=True -> width='stretch')
-        st.plotly_chart(fig, use_container_width=True) 
+    division = px.bar(
+        dimension_stats(data, 'business_division', measures=('revenue',))['revenue_sum']
+            .rename('revenue').reset_index().sort_values('revenue', ascending=False),
+        x='business_division', y='revenue',
+        title='Revenue by Business Division',
+        color='business_division', text_auto='.2s'
+    )
+    division.update_layout(showlegend=False, height=420)
 
     # Revenue by Region (pie)
-    with col2:
-        fig = px.pie(
-            data.groupby('region')['revenue'].sum().reset_index(),
-            values='revenue', names='region',
-            title='Revenue Share by Region', hole=0.4
-        )
-        # Fix 2: Deprecation replacement (use_container_width=True -> width='stretch')
-        st.plotly_chart(fig, use_container_width=True) 
+    region = px.pie(
+        dimension_stats(data, 'region', measures=('revenue',))['revenue_sum'].rename('revenue').reset_index(),
+        values='revenue', names='region',
+        title='Revenue Share by Region', hole=0.4
+    )
+    return {'division': division, 'region': region}
 
-    # Revenue Trend
-    trend = data.groupby('date')['revenue'].sum().reset_index()
-    fig = px.line(trend, x='date', y='revenue', title='Revenue Trend Over Time',
-                  markers=True, line_shape='spline')
-    fig.update_traces(line_color='#1f77b4', line_width=3)
-    # Fix 3: Deprecation replacement (use_container_width=True -> width='stretch')
-    st.plotly_chart(fig,use_container_width=True) 
+TREND_MAX_POINTS = 600  # about one point per 2px of a wide chart; caps the trend payload
+TREND_RESOLUTIONS = {'Daily': ('D', 1), 'Weekly': ('W', 7), 'Monthly': ('MS', 30.44)}  # freq, days per bucket
+TREND_MARKER_LIMIT = 120  # draw point markers only while they stay readable
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points preserving the series' visual shape"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype('float64')
+    y = y.astype('float64')
+    # First and last points are kept; the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        # Pick the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+def build_trend_section(data: pd.DataFrame, resolution: str = 'Auto') -> dict:
+    """
+    Revenue trend at a resolution that fits TREND_MAX_POINTS whatever the history length:
+    Auto picks the finest of day/week/month buckets that fits; an explicit resolution
+    that does not fit is LTTB-downsampled. Rendered as a WebGL (Scattergl) trace.
+    """
+    daily = data.groupby('date')['revenue'].sum()
+    span_days = (daily.index.max() - daily.index.min()).days + 1 if len(daily) else 0
+    if resolution == 'Auto':
+        resolution = next((name for name, (_, days) in TREND_RESOLUTIONS.items()
+                           if span_days / days <= TREND_MAX_POINTS), 'Monthly')
+    freq, _ = TREND_RESOLUTIONS[resolution]
+    series = daily if freq == 'D' else daily.resample(freq).sum()
+
+    sampled = ""
+    if len(series) > TREND_MAX_POINTS:
+        keep = lttb(series.index.asi8, series.to_numpy(), TREND_MAX_POINTS)
+        sampled = f", {TREND_MAX_POINTS} of {len(series):,} points"
+        series = series.iloc[keep]
+
+    unit = {'Daily': 'day', 'Weekly': 'week', 'Monthly': 'month'}[resolution]
+    fig = go.Figure(go.Scattergl(
+        x=series.index, y=series.to_numpy(), name='revenue',
+        mode='lines+markers' if len(series) <= TREND_MARKER_LIMIT else 'lines',
+        line=dict(color='#1f77b4', width=3)
+    ))
+    fig.update_layout(title=f'Revenue Trend Over Time ({resolution.lower()}{sampled})',
+                      xaxis_title='date', yaxis_title=f'revenue per {unit}')
+    return {'trend': fig, 'resolution': resolution}
+
+def build_products_section(data: pd.DataFrame, top_x: int) -> dict:
+    stats = dimension_stats(data, 'product')
 
-def create_products_analysis(data: pd.DataFrame):
-    """Render products-focused analysis"""
-    st.subheader("📦 Products Performance Analysis")
-    
-    col1, col2 = st.columns([1, 3])
-    with col1:
-        top_x = st.slider("Show Top Products:", 3, 20, st.session_state.top_x_requested, key="products_slider")
-        st.session_state.top_x_requested = top_x
-    
     # Top Products by Revenue
     top_df = (
-        data.groupby('product')['revenue']
-        .sum()
+        stats['revenue_sum']
+        .rename('revenue')
         .nlargest(top_x)
         .reset_index()
         .sort_values('revenue', ascending=False)
     )
-    
-    fig = px.bar(
+    top = px.bar(
         top_df,
         x='revenue',
         y='product',
@@ -198,152 +633,201 @@ def create_products_analysis(data: pd.DataFrame):
         text='revenue',
         color_continuous_scale='Blues'
     )
-    fig.update_traces(texttemplate='৳%{text:,.0f}', textposition='outside')
-    fig.update_layout(
+    top.update_traces(texttemplate='৳%{text:,.0f}', textposition='outside')
+    top.update_layout(
         height=120 + 45*top_x,
         showlegend=False,
         yaxis={'categoryorder': 'total ascending'}
     )
+
+    # Products by Division
+    division_products = (dimension_stats(data, ['business_division', 'product'], measures=('revenue',))['revenue_sum']
+                         .rename('revenue').reset_index())
+    top_division_products = division_products.loc[division_products.groupby('business_division', observed=True)['revenue'].idxmax()]
+    by_division = px.bar(
+        top_division_products,
+        x='business_division',
+        y='revenue',
+        color='product',
+        title='Top Product in Each Division',
+        text='revenue'
+    )
+    by_division.update_traces(texttemplate='৳%{text:,.0f}')
+
+    # Product Performance Table - WITHOUT quantity_sold
+    product_summary = stats[['revenue_sum', 'profit_sum', 'profit_margin_mean', 'count']].set_axis(
+        ['revenue', 'profit', 'profit_margin', 'transaction_count'], axis=1
+    ).round(2).sort_values('revenue', ascending=False)
+    return {'top': top, 'by_division': by_division, 'summary': product_summary.head(10)}
+
+def build_regional_section(data: pd.DataFrame) -> dict:
+    stats = dimension_stats(data, 'region')
+
+    # Revenue by Region
+    region_revenue = stats['revenue_sum'].rename('revenue').reset_index().sort_values('revenue', ascending=False)
+    revenue = px.bar(
+        region_revenue,
+        x='region',
+        y='revenue',
+        title='Revenue by Region',
+        color='revenue',
+        text='revenue'
+    )
+    revenue.update_traces(texttemplate='৳%{text:,.0f}')
+
+    # Profit Margin by Region
+    region_margin = stats['profit_margin_mean'].rename('profit_margin').reset_index().sort_values('profit_margin', ascending=False)
+    margin = px.bar(
+        region_margin,
+        x='region',
+        y='profit_margin',
+        title='Average Profit Margin by Region',
+        color='profit_margin',
+        text='profit_margin'
+    )
+    margin.update_traces(texttemplate='%{text:.2f}%')
+
+    # Regional Performance Details - FIXED: Remove quantity_sold
+    regional_metrics = stats[['revenue_sum', 'revenue_mean', 'profit_sum', 'profit_margin_mean', 'count']].set_axis(
+        ['Total Revenue', 'Avg Revenue', 'Total Profit', 'Avg Margin', 'Transaction Count'], axis=1
+    ).round(2)
+    return {'revenue': revenue, 'margin': margin,
+            'metrics': regional_metrics.sort_values('Total Revenue', ascending=False)}
+
+def build_customers_section(data: pd.DataFrame) -> dict:
+    stats = dimension_stats(data, 'customer_segment')
+
+    # Revenue by Customer Segment
+    segment_revenue = stats['revenue_sum'].rename('revenue').reset_index()
+    share = px.pie(
+        segment_revenue,
+        values='revenue',
+        names='customer_segment',
+        title='Revenue Distribution by Customer Segment',
+        hole=0.4
+    )
+
+    # Customer Segment Performance - FIXED: Remove quantity_sold
+    segment_stats = stats[['revenue_sum', 'profit_margin_mean']].set_axis(
+        ['revenue', 'profit_margin'], axis=1
+    ).reset_index()
+    revenue = px.bar(
+        segment_stats,
+        x='customer_segment',
+        y='revenue',
+        title='Revenue by Customer Segment',
+        color='profit_margin',
+        text='revenue'
+    )
+    revenue.update_traces(texttemplate='৳%{text:,.0f}')
+
+    # Customer Segment Details - FIXED: Remove quantity_sold
+    segment_details = stats[['revenue_sum', 'revenue_mean', 'count', 'profit_sum', 'profit_margin_mean']].set_axis(
+        ['Total Revenue', 'Avg Revenue', 'Transactions', 'Total Profit', 'Avg Margin'], axis=1
+    ).round(2)
+    return {'share': share, 'revenue': revenue, 'details': segment_details}
+
+SECTION_BUILDERS = {
+    'overview': build_overview_section,
+    'trend': build_trend_section,
+    'products': build_products_section,
+    'regional': build_regional_section,
+    'customers': build_customers_section,
+}
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def cached_section(section: str, params: tuple, fingerprint: tuple, _data: pd.DataFrame) -> dict:
+    """
+    Figures and tables for one dashboard section, built once per
+    (section, parameters, dataset version) and shared by every session.
+    Treat the returned objects as read-only.
+    """
+    return SECTION_BUILDERS[section](_data, **dict(params))
+
+def get_section(section: str, data: pd.DataFrame, **params) -> dict:
+    return cached_section(section, tuple(sorted(params.items())), dataset_fingerprint(data), data)
+
+def create_dashboard_overview(data: pd.DataFrame):
+    """Render main dashboard overview"""
+    parts = get_section('overview', data)
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Fix 1: Deprecation replacement (use_container_width=True -> width='stretch')
+        st.plotly_chart(parts['division'], use_container_width=True) 
+
+    with col2:
+        # Fix 2: Deprecation replacement (use_container_width=True -> width='stretch')
+        st.plotly_chart(parts['region'], use_container_width=True) 
+
+    resolution = st.selectbox("Trend resolution", ['Auto'] + list(TREND_RESOLUTIONS), key="trend_resolution")
+    trend = get_section('trend', data, resolution=resolution)
+    # Fix 3: Deprecation replacement (use_container_width=True -> width='stretch')
+    st.plotly_chart(trend['trend'], use_container_width=True) 
+
+def create_products_analysis(data: pd.DataFrame):
+    """Render products-focused analysis"""
+    st.subheader("📦 Products Performance Analysis")
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        top_x = st.slider("Show Top Products:", 3, 20, st.session_state.top_x_requested, key="products_slider")
+        st.session_state.top_x_requested = top_x
+    
+    parts = get_section('products', data, top_x=top_x)
     # Fix 4: Deprecation replacement (use_container_width=True -> width='stretch')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(parts['top'], use_container_width=True)
     
-    # Products by Division
     col1, col2 = st.columns(2)
     with col1:
-        division_products = data.groupby(['business_division', 'product'])['revenue'].sum().reset_index()
-        top_division_products = division_products.loc[division_products.groupby('business_division')['revenue'].idxmax()]
-        
-        fig = px.bar(
-            top_division_products,
-            x='business_division',
-            y='revenue',
-            color='product',
-            title='Top Product in Each Division',
-            text='revenue'
-        )
-        fig.update_traces(texttemplate='৳%{text:,.0f}')
         # Fix 5: Deprecation replacement (use_container_width=True -> width='stretch')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(parts['by_division'], use_container_width=True)
     
     with col2:
-        # Product Performance Table - WITHOUT quantity_sold
         st.subheader("Product Performance Summary")
-        product_summary = data.groupby('product').agg({
-            'revenue': 'sum',
-            'profit': 'sum',
-            'profit_margin': 'mean'
-        }).round(2).sort_values('revenue', ascending=False)
-        
-        # Add transaction count instead of quantity_sold
-        product_summary['transaction_count'] = data.groupby('product').size()
         # Fix 6: Deprecation replacement (use_container_width=True -> width='stretch')
-        st.dataframe(product_summary.head(10),use_container_width=True)
+        st.dataframe(parts['summary'], use_container_width=True)
 
 def create_regional_analysis(data: pd.DataFrame):
     """Render regional performance analysis"""
     st.subheader("🌍 Regional Performance Analysis")
+    parts = get_section('regional', data)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        # Revenue by Region
-        region_revenue = data.groupby('region')['revenue'].sum().reset_index().sort_values('revenue', ascending=False)
-        fig = px.bar(
-            region_revenue,
-            x='region',
-            y='revenue',
-            title='Revenue by Region',
-            color='revenue',
-            text='revenue'
-        )
-        fig.update_traces(texttemplate='৳%{text:,.0f}')
         # Fix 7: Deprecation replacement (use_container_width=True -> width='stretch')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(parts['revenue'], use_container_width=True)
     
     with col2:
-        # Profit Margin by Region
-        region_margin = data.groupby('region')['profit_margin'].mean().reset_index().sort_values('profit_margin', ascending=False)
-        fig = px.bar(
-            region_margin,
-            x='region',
-            y='profit_margin',
-            title='Average Profit Margin by Region',
-            color='profit_margin',
-            text='profit_margin'
-        )
-        fig.update_traces(texttemplate='%{text:.2f}%')
         # Fix 8: Deprecation replacement (use_container_width=True -> width='stretch')
-        st.plotly_chart(fig,use_container_width=True)
+        st.plotly_chart(parts['margin'], use_container_width=True)
     
-    # Regional Performance Details - FIXED: Remove quantity_sold
     st.subheader("Regional Performance Metrics")
-    regional_metrics = data.groupby('region').agg({
-        'revenue': ['sum', 'mean'],
-        'profit': 'sum',
-        'profit_margin': 'mean'
-    }).round(2)
-    
-    # Flatten column names and add transaction count
-    regional_metrics.columns = ['Total Revenue', 'Avg Revenue', 'Total Profit', 'Avg Margin']
-    regional_metrics['Transaction Count'] = data.groupby('region').size()
-    
     # Fix 9: Deprecation replacement (use_container_width=True -> width='stretch')
     #st.dataframe(regional_metrics.sort_values('Total Revenue', ascending=False), width='stretch')
-    st.dataframe(regional_metrics.sort_values('Total Revenue', ascending=False), use_container_width=True)
+    st.dataframe(parts['metrics'], use_container_width=True)
 
 
 def create_customer_analysis(data: pd.DataFrame):
     """Render customer segment analysis"""
     st.subheader("👥 Customer Segment Analysis")
+    parts = get_section('customers', data)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        # Revenue by Customer Segment
-        segment_revenue = data.groupby('customer_segment')['revenue'].sum().reset_index()
-        fig = px.pie(
-            segment_revenue,
-            values='revenue',
-            names='customer_segment',
-            title='Revenue Distribution by Customer Segment',
-            hole=0.4
-        )
         # Fix 10: Deprecation replacement (use_container_width=True -> width='stretch')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(parts['share'], use_container_width=True)
     
     with col2:
-        # Customer Segment Performance - FIXED: Remove quantity_sold
-        segment_stats = data.groupby('customer_segment').agg({
-            'revenue': 'sum',
-            'profit_margin': 'mean'
-        }).reset_index()
-        
-        fig = px.bar(
-            segment_stats,
-            x='customer_segment',
-            y='revenue',
-            title='Revenue by Customer Segment',
-            color='profit_margin',
-            text='revenue'
-        )
-        fig.update_traces(texttemplate='৳%{text:,.0f}')
         # Fix 11: Deprecation replacement (use_container_width=True -> width='stretch')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(parts['revenue'], use_container_width=True)
     
-    # Customer Segment Details - FIXED: Remove quantity_sold
     st.subheader("Customer Segment Performance Details")
-    segment_details = data.groupby('customer_segment').agg({
-        'revenue': ['sum', 'mean', 'count'],
-        'profit': 'sum',
-        'profit_margin': 'mean'
-    }).round(2)
-    
-    # Flatten column names
-    segment_details.columns = ['Total Revenue', 'Avg Revenue', 'Transactions', 'Total Profit', 'Avg Margin']
-    
     # Fix 12: Deprecation replacement (use_container_width=True -> width='stretch')
     #st.dataframe(segment_details, width='stretch')
-    st.dataframe(segment_details, use_container_width=True)
+    st.dataframe(parts['details'], use_container_width=True)
 
 def create_visualizations(data: pd.DataFrame):
     """Render all dashboard charts based on selected section"""
@@ -358,126 +842,128 @@ def create_visualizations(data: pd.DataFrame):
     elif section == "customers":
         create_customer_analysis(data)
 
-def process_query(query: str, data: pd.DataFrame) -> str:
-    """Natural language query processor"""
-    q = query.lower().strip()
-    
-    # Top X Products
-    top_x_match = re.search(r'top\s*(\d+)\s*products?', q)
-    if top_x_match:
-        try:
-            x = max(1, int(top_x_match.group(1)))
-        except Exception:
-            x = 5
-        st.session_state.top_x_requested = x
-        top = (
-            data.groupby('product')['revenue']
-            .sum()
-            .nlargest(x)
-            .reset_index()
-            .sort_values('revenue', ascending=False)
-        )
-        txt = f"**Top {x} Products by Revenue**\n\n"
-        for i, row in top.iterrows():
-            txt += f"{i+1}. **{row['product']}** – ৳{row['revenue']:,.0f}\n"
-        return txt
-
-    # Forecast Next X Days
-    elif any(x in q for x in ["forecast", "predict", "next"]) and "day" in q:
-        days_match = re.search(r'next\s*(\d+)\s*day', q) or re.search(r'(\d+)\s*day', q)
-        try:
-            days = int(days_match.group(1)) if days_match else 30
-        except Exception:
-            days = 30
-
-        recent_daily = data['revenue'].tail(300).mean()
-        prev_daily = data['revenue'].tail(600).head(300).mean()
-        growth_rate = (recent_daily - prev_daily) / prev_daily if prev_daily else 0
-        forecast = recent_daily * days * (1 + growth_rate)
-
-        txt = f"**{days}-Day Revenue Forecast:** ৳{forecast:,.0f}\n"
-        txt += f"**Expected Daily Growth:** {growth_rate*100:+.2f}%\n\n"
-        txt += "Recommendation: Increase inventory and marketing" if growth_rate > 0 else "Recommendation: Review pricing strategy"
-        return txt
-
-    # Total Revenue
-    elif any(x in q for x in ["total revenue", "overall sales", "total sales"]):
-        return f"**Total Revenue:** ৳{data['revenue'].sum():,.2f}"
-
-    # Revenue by Division
-    elif any(x in q for x in ["division", "business division", "by division"]):
-        s = data.groupby('business_division')['revenue'].sum().sort_values(ascending=False)
-        txt = "**Revenue by Business Division**\n\n"
-        for div, rev in s.items():
-            pct = rev / s.sum() * 100
-            txt += f"• **{div}**: ৳{rev:,.0f} ({pct:.1f}%)\n"
-        return txt
+# ----------------------------------------------------------------------
+# Chat Intents (compiled routing table over intent_router.SALES_INTENTS;
+# registration order = precedence)
+# ----------------------------------------------------------------------
+intent_router = IntentRouter()
 
-    # Revenue by Region
-    elif "region" in q:
-        s = data.groupby('region')['revenue'].sum().sort_values(ascending=False)
-        txt = "**Revenue by Region**\n\n"
-        for r, rev in s.items():
-            pct = rev / s.sum() * 100
-            txt += f"• **{r}**: ৳{rev:,.0f} ({pct:.1f}%)\n"
-        return txt
-
-    # Profit & Margin
-    elif any(x in q for x in ["profit", "margin"]):
-        txt = f"**Total Profit:** ৳{data['profit'].sum():,.2f}\n"
-        txt += f"**Average Margin:** {data['profit_margin'].mean():.2f}%\n\n"
-        txt += "**Margin by Division**\n"
-        for div, m in data.groupby('business_division')['profit_margin'].mean().items():
-            txt += f"• {div}: {m:.2f}%\n"
-        return txt
-
-    # Trends
-    elif any(x in q for x in ["trend", "over time", "growth"]):
-        monthly = data.groupby(data['date'].dt.to_period('M'))['revenue'].sum()
-        recent = monthly.tail(3).mean()
-        prev = monthly.tail(6).head(3).mean()
-        growth = (recent - prev) / prev * 100 if prev else 0
-        txt = f"**Recent 3-Month Avg:** ৳{recent:,.0f}\n"
-        txt += f"**Previous 3-Month Avg:** ৳{prev:,.0f}\n"
-        txt += f"**Growth Rate:** {growth:+.2f}%\n\n"
-        if growth > 5:
-            txt += "Strong growth!"
-        elif growth > 0:
-            txt += "Moderate growth"
-        else:
-            txt += "Warning: Declining trend"
-        return txt
-
-    # Customer Segments
-    elif "segment" in q or "customer" in q:
-        s = data.groupby('customer_segment')['revenue'].sum().sort_values(ascending=False)
-        txt = "**Revenue by Customer Segment**\n\n"
-        for seg, rev in s.items():
-            count = data[data['customer_segment'] == seg].shape[0]
-            avg = rev / count
-            txt += f"**{seg}**\n"
-            txt += f"• Revenue: ৳{rev:,.0f}\n"
-            txt += f"• Transactions: {count:,}\n"
-            txt += f"• Avg/Transaction: ৳{avg:,.0f}\n\n"
-        return txt
-
-    # Executive Summary
-    elif any(x in q for x in ["summary", "overview", "dashboard"]):
-        s = get_analytics_summary(data)
-        txt = f"**EXECUTIVE SUMMARY**\n\n"
-        txt += f"• Total Revenue: ৳{s['total_revenue']:,.0f}\n"
-        txt += f"• Total Profit: ৳{s['total_profit']:,.0f}\n"
-        txt += f"• Avg Margin: {s['avg_margin']:.2f}%\n"
-        txt += f"• Transactions: {s['total_transactions']:,}\n\n"
-        txt += f"**Top Performers**\n"
-        txt += f"• Division: {s['top_division']}\n"
-        txt += f"• Product: {s['top_product']}\n"
-        txt += f"• Region: {s['top_region']}\n"
-        return txt
-
-    # Default Help
+def _remember_top_x(x: int):
+    st.session_state.top_x_requested = x  # the Products dashboard opens at the requested size
+
+# Top X Products
+@intent_router.intent('top_products', **SALES_INTENTS['top_products'], on_match=_remember_top_x)
+def answer_top_products(data: pd.DataFrame, x: int = 5) -> str:
+    top = (
+        dimension_stats(data, 'product', measures=('revenue',))['revenue_sum']
+        .rename('revenue')
+        .nlargest(x)
+        .reset_index()
+        .sort_values('revenue', ascending=False)
+    )
+    txt = f"**Top {x} Products by Revenue**\n\n"
+    for i, row in top.iterrows():
+        txt += f"{i+1}. **{row['product']}** – ৳{row['revenue']:,.0f}\n"
+    return txt
+
+# Forecast Next X Days
+@intent_router.intent('forecast', **SALES_INTENTS['forecast'])
+def answer_forecast(data: pd.DataFrame, days: int = 30) -> str:
+    recent_daily = data['revenue'].tail(300).mean()
+    prev_daily = data['revenue'].tail(600).head(300).mean()
+    growth_rate = (recent_daily - prev_daily) / prev_daily if prev_daily else 0
+    forecast = recent_daily * days * (1 + growth_rate)
+
+    txt = f"**{days}-Day Revenue Forecast:** ৳{forecast:,.0f}\n"
+    txt += f"**Expected Daily Growth:** {growth_rate*100:+.2f}%\n\n"
+    txt += "Recommendation: Increase inventory and marketing" if growth_rate > 0 else "Recommendation: Review pricing strategy"
+    return txt
+
+# Total Revenue
+@intent_router.intent('total_revenue', **SALES_INTENTS['total_revenue'])
+def answer_total_revenue(data: pd.DataFrame) -> str:
+    return f"**Total Revenue:** ৳{data['revenue'].sum():,.2f}"
+
+# Revenue by Division
+@intent_router.intent('division', **SALES_INTENTS['division'])
+def answer_division(data: pd.DataFrame) -> str:
+    s = dimension_stats(data, 'business_division', measures=('revenue',))['revenue_sum'].sort_values(ascending=False)
+    txt = "**Revenue by Business Division**\n\n"
+    for div, rev in s.items():
+        pct = rev / s.sum() * 100
+        txt += f"• **{div}**: ৳{rev:,.0f} ({pct:.1f}%)\n"
+    return txt
+
+# Revenue by Region
+@intent_router.intent('region', **SALES_INTENTS['region'])
+def answer_region(data: pd.DataFrame) -> str:
+    s = dimension_stats(data, 'region', measures=('revenue',))['revenue_sum'].sort_values(ascending=False)
+    txt = "**Revenue by Region**\n\n"
+    for r, rev in s.items():
+        pct = rev / s.sum() * 100
+        txt += f"• **{r}**: ৳{rev:,.0f} ({pct:.1f}%)\n"
+    return txt
+
+# Profit & Margin
+@intent_router.intent('profit_margin', **SALES_INTENTS['profit_margin'])
+def answer_profit_margin(data: pd.DataFrame) -> str:
+    txt = f"**Total Profit:** ৳{data['profit'].sum():,.2f}\n"
+    txt += f"**Average Margin:** {data['profit_margin'].astype('float64').mean():.2f}%\n\n"
+    txt += "**Margin by Division**\n"
+    for div, m in dimension_stats(data, 'business_division', measures=('profit_margin',))['profit_margin_mean'].items():
+        txt += f"• {div}: {m:.2f}%\n"
+    return txt
+
+# Trends
+@intent_router.intent('trend', **SALES_INTENTS['trend'])
+def answer_trend(data: pd.DataFrame) -> str:
+    monthly = data.groupby(data['date'].dt.to_period('M'))['revenue'].sum()
+    recent = monthly.tail(3).mean()
+    prev = monthly.tail(6).head(3).mean()
+    growth = (recent - prev) / prev * 100 if prev else 0
+    txt = f"**Recent 3-Month Avg:** ৳{recent:,.0f}\n"
+    txt += f"**Previous 3-Month Avg:** ৳{prev:,.0f}\n"
+    txt += f"**Growth Rate:** {growth:+.2f}%\n\n"
+    if growth > 5:
+        txt += "Strong growth!"
+    elif growth > 0:
+        txt += "Moderate growth"
     else:
-        return """**Ask me anything about sales!** Examples:
+        txt += "Warning: Declining trend"
+    return txt
+
+# Customer Segments
+@intent_router.intent('segments', **SALES_INTENTS['segments'])
+def answer_segments(data: pd.DataFrame) -> str:
+    stats = dimension_stats(data, 'customer_segment', measures=('revenue',)).sort_values('revenue_sum', ascending=False)
+    txt = "**Revenue by Customer Segment**\n\n"
+    for seg, rev, count in zip(stats.index, stats['revenue_sum'], stats['count']):
+        avg = rev / count
+        txt += f"**{seg}**\n"
+        txt += f"• Revenue: ৳{rev:,.0f}\n"
+        txt += f"• Transactions: {count:,}\n"
+        txt += f"• Avg/Transaction: ৳{avg:,.0f}\n\n"
+    return txt
+
+# Executive Summary
+@intent_router.intent('summary', **SALES_INTENTS['summary'])
+def answer_summary(data: pd.DataFrame) -> str:
+    s = get_dataset().summary
+    txt = f"**EXECUTIVE SUMMARY**\n\n"
+    txt += f"• Total Revenue: ৳{s['total_revenue']:,.0f}\n"
+    txt += f"• Total Profit: ৳{s['total_profit']:,.0f}\n"
+    txt += f"• Avg Margin: {s['avg_margin']:.2f}%\n"
+    txt += f"• Transactions: {s['total_transactions']:,}\n\n"
+    txt += f"**Top Performers**\n"
+    txt += f"• Division: {s['top_division']}\n"
+    txt += f"• Product: {s['top_product']}\n"
+    txt += f"• Region: {s['top_region']}\n"
+    return txt
+
+# Default Help
+@intent_router.fallback
+def answer_help(data: pd.DataFrame) -> str:
+    return """**Ask me anything about sales!** Examples:
 • _"top 7 products"_  
 • _"forecast next 3 days"_  
 • _"next 15 days"_  
@@ -485,6 +971,16 @@ def process_query(query: str, data: pd.DataFrame) -> str:
 • _"Show revenue by division"_  
 • _"Customer segments"_"""
 
+@st.cache_resource(show_spinner=False)
+def get_answer_cache() -> AnswerCache:
+    """Intent answers shared by every session (keys carry the dataset fingerprint)"""
+    return AnswerCache(maxsize=512)
+
+def process_query(query: str, data: pd.DataFrame) -> str:
+    """Natural language query processor (one automaton pass, then the matching intent's
+    handler; answers are memoized per intent, parameters and dataset version)"""
+    return intent_router.route(query, data, cache=get_answer_cache(), fingerprint=dataset_fingerprint(data))
+
 # ----------------------------------------------------------------------
 # Sidebar with Dashboard Links
 # ----------------------------------------------------------------------
@@ -501,12 +997,12 @@ with st.sidebar:
             st.success("Data loaded!")
 
     if st.session_state.data_loaded:
-        d = st.session_state.sales_data
+        summary = get_dataset().summary
         st.success("✅ System Ready")
-        st.metric("Records", f"{len(d):,}")
-        st.metric("Date Range", f"{(d['date'].max() - d['date'].min()).days} days")
-        st.metric("Products", f"{d['product'].nunique()}")
-        st.metric("Divisions", f"{d['business_division'].nunique()}")
+        st.metric("Records", f"{summary['records']:,}")
+        st.metric("Date Range", f"{summary['date_span_days']} days")
+        st.metric("Products", f"{summary['products']}")
+        st.metric("Divisions", f"{summary['divisions']}")
     else:
         st.warning("⚠️ No data loaded")
 
@@ -574,8 +1070,9 @@ st.markdown(f"<p style='text-align:center; color:#888;'>Report Date: {datetime.n
 # ----------------------------------------------------------------------
 # Data Load Guard
 # ----------------------------------------------------------------------
-if not st.session_state.data_loaded or st.session_state.sales_data is None:
-    st.info("Click **'Refresh Data'** in the sidebar to load `akij_sales_data.csv`.")
+if not st.session_state.data_loaded or st.session_state.data_source is None:
+    st.info(f"Click **'Refresh Data'** in the sidebar to load `{ARROW_SNAPSHOT_FILE}` "
+            f"(or `{DATA_STORE_DIR}/`, `{DATA_CSV_FILE}`).")
     # Fix 17: Deprecation replacement (use_container_width=True -> width='stretch')
     #if st.button("Refresh Data", width='stretch'): 
     if st.button("Refresh Data", use_container_width=True , key="refresh_btn_sidebar"): 
@@ -585,7 +1082,7 @@ if not st.session_state.data_loaded or st.session_state.sales_data is None:
         st.success("Data loaded!")
     st.stop()
 
-data = st.session_state.sales_data
+data = get_data()
 
 # ----------------------------------------------------------------------
 # Handle Pending Query (from sidebar)
@@ -615,7 +1112,7 @@ st.session_state.active_tab = {"Chat Assistant": "chat", "Dashboard": "dashboard
 # ----------------------------------------------------------------------
 # TAB 1: Chat Assistant
 # ----------------------------------------------------------------------
-if st.session_state.active_tab == "chat":
+def render_chat_tab(data: pd.DataFrame):
     st.markdown("### 🤖 AI Sales Assistant")
     st.markdown("Ask any question about sales, revenue, products, or trends.")
 
@@ -648,7 +1145,7 @@ if st.session_state.active_tab == "chat":
 # ----------------------------------------------------------------------
 # TAB 2: Dashboard
 # ----------------------------------------------------------------------
-elif st.session_state.active_tab == "dashboard":
+def render_dashboard_tab(data: pd.DataFrame):
     # Dashboard Header with Section Info
     section_titles = {
         "overview": "Overview Dashboard",
@@ -659,80 +1156,98 @@ elif st.session_state.active_tab == "dashboard":
     
     st.markdown(f"### 📊 {section_titles[st.session_state.dashboard_section]}")
 
-    # KPI Cards (shown in all dashboard sections)
+    # KPI Cards (shown in all dashboard sections; served from the precomputed summary)
+    summary = get_dataset().summary
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("Total Revenue", f"৳{data['revenue'].sum():,.0f}")
+        st.metric("Total Revenue", f"৳{summary['total_revenue']:,.0f}")
         st.markdown('</div>', unsafe_allow_html=True)
     with col2:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("Total Profit", f"৳{data['profit'].sum():,.0f}")
+        st.metric("Total Profit", f"৳{summary['total_profit']:,.0f}")
         st.markdown('</div>', unsafe_allow_html=True)
     with col3:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("Avg Margin", f"{data['profit_margin'].mean():.2f}%")
+        st.metric("Avg Margin", f"{summary['avg_margin']:.2f}%")
         st.markdown('</div>', unsafe_allow_html=True)
     with col4:
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("Transactions", f"{len(data):,}")
+        st.metric("Transactions", f"{summary['total_transactions']:,}")
         st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown("---")
     create_visualizations(data)
 
 # ----------------------------------------------------------------------
-# TAB 3: Analytics
+# TAB 3: Analytics (each analysis computed only when selected)
 # ----------------------------------------------------------------------
-else:
+def render_descriptive(data: pd.DataFrame):
+    st.markdown("#### What has happened?")
+    s = get_dataset().summary
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown("**Overall Performance**")
+        st.write(f"• Revenue: ৳{s['total_revenue']:,.0f}")
+        st.write(f"• Profit: ৳{s['total_profit']:,.0f}")
+        st.write(f"• Avg Margin: {s['avg_margin']:.2f}%")
+        st.write(f"• Transactions: {s['total_transactions']:,}")
+    with c2:
+        st.markdown("**Top Performers**")
+        st.write(f"• Division: **{s['top_division']}**")
+        st.write(f"• Product: **{s['top_product']}**")
+        st.write(f"• Region: **{s['top_region']}**")
+
+def render_diagnostic(data: pd.DataFrame):
+    st.markdown("#### Why did it happen?")
+    s = get_dataset().summary
+    overall = s['avg_margin']
+    st.markdown("**Profit Margin Analysis by Division**")
+    for div, m in s['division_margins'].items():
+        status = "Above Average" if m >= overall else "Below Average"
+        st.write(f"**{div}**: {m:.2f}% → {status}")
+
+def render_predictive(data: pd.DataFrame):
+    st.markdown("#### What is likely to happen?")
+    recent = data.tail(300)['revenue'].mean()
+    prev = data.tail(600).head(300)['revenue'].mean()
+    growth = (recent - prev) / prev if prev else 0
+    forecast = recent * 30 * (1 + growth)
+    st.write(f"**30-Day Revenue Forecast:** ৳{forecast:,.0f}")
+    st.write(f"**Growth Rate:** {growth*100:+.2f}%")
+    if growth > 0:
+        st.success("Positive growth trend")
+    else:
+        st.warning("Declining trend")
+
+def render_prescriptive(data: pd.DataFrame):
+    st.markdown("#### What should be done?")
+    st.markdown("**Recommended Actions:**")
+    st.write("1. **Focus** on high-margin divisions")
+    st.write("2. **Expand** top-selling product lines")
+    st.write("3. **Strengthen** presence in top regions")
+    st.write("4. **Optimize** underperforming sales channels")
+    st.write("5. **Adopt** seasonal inventory planning")
+
+ANALYTICS_VIEWS = {
+    "Descriptive": render_descriptive,
+    "Diagnostic": render_diagnostic,
+    "Predictive": render_predictive,
+    "Prescriptive": render_prescriptive,
+}
+
+def render_analytics_tab(data: pd.DataFrame):
     st.markdown("### 🔍 Advanced Analytics")
     # This element did not use use_container_width, but was mentioned for clarity in previous response
-    analysis = st.selectbox("Choose Analysis Type", [
-        "Descriptive", "Diagnostic", "Predictive", "Prescriptive"
-    ])
+    analysis = st.selectbox("Choose Analysis Type", list(ANALYTICS_VIEWS))
+    ANALYTICS_VIEWS[analysis](data)
 
-    if analysis == "Descriptive":
-        st.markdown("#### What has happened?")
-        s = get_analytics_summary(data)
-        c1, c2 = st.columns(2)
-        with c1:
-            st.markdown("**Overall Performance**")
-            st.write(f"• Revenue: ৳{s['total_revenue']:,.0f}")
-            st.write(f"• Profit: ৳{s['total_profit']:,.0f}")
-            st.write(f"• Avg Margin: {s['avg_margin']:.2f}%")
-            st.write(f"• Transactions: {s['total_transactions']:,}")
-        with c2:
-            st.markdown("**Top Performers**")
-            st.write(f"• Division: **{s['top_division']}**")
-            st.write(f"• Product: **{s['top_product']}**")
-            st.write(f"• Region: **{s['top_region']}**")
-
-    elif analysis == "Diagnostic":
-        st.markdown("#### Why did it happen?")
-        overall = data['profit_margin'].mean()
-        st.markdown("**Profit Margin Analysis by Division**")
-        for div, m in data.groupby('business_division')['profit_margin'].mean().items():
-            status = "Above Average" if m >= overall else "Below Average"
-            st.write(f"**{div}**: {m:.2f}% → {status}")
-
-    elif analysis == "Predictive":
-        st.markdown("#### What is likely to happen?")
-        recent = data.tail(300)['revenue'].mean()
-        prev = data.tail(600).head(300)['revenue'].mean()
-        growth = (recent - prev) / prev if prev else 0
-        forecast = recent * 30 * (1 + growth)
-        st.write(f"**30-Day Revenue Forecast:** ৳{forecast:,.0f}")
-        st.write(f"**Growth Rate:** {growth*100:+.2f}%")
-        if growth > 0:
-            st.success("Positive growth trend")
-        else:
-            st.warning("Declining trend")
-
-    else:  # Prescriptive
-        st.markdown("#### What should be done?")
-        st.markdown("**Recommended Actions:**")
-        st.write("1. **Focus** on high-margin divisions")
-        st.write("2. **Expand** top-selling product lines")
-        st.write("3. **Strengthen** presence in top regions")
-        st.write("4. **Optimize** underperforming sales channels")
-        st.write("5. **Adopt** seasonal inventory planning")
\ No newline at end of file
+# ----------------------------------------------------------------------
+# Render only the active tab
+# ----------------------------------------------------------------------
+TAB_RENDERERS = {
+    "chat": render_chat_tab,
+    "dashboard": render_dashboard_tab,
+    "analytics": render_analytics_tab,
+}
+TAB_RENDERERS[st.session_state.active_tab](data)
@@ -5,6 +5,10 @@ Streamlit Web Application with Conversational AI Interface
 Author: Abdul Matin
 Organization: Akij Resource
 Date: November 2025
+
+Run from the project root (intent_router.py lives there; `python -m` puts the
+current directory on the import path):
+    python -m streamlit run docs/chatbot_ui_llm.py
 =============================================================================
 """
 
@@ -13,12 +17,18 @@ import pandas as pd
 import plotly.express as px
 from datetime import datetime
 import os
-import re
+import threading
+import time
 import ollama # <--- ADDED OLLAMA IMPORT
 
+# The chat intent keyword table is shared with chatbot_ui.py at the repository root
+from intent_router import IntentRouter, SALES_INTENTS
+
 # --- OLLAMA CONFIGURATION ---
 # Using 'gemma3:latest' as per your available models (ollama list)
 OLLAMA_MODEL = "gemma3:latest" 
+HISTORY_TOKEN_BUDGET = 1500  # newest chat turns, sent verbatim
+SUMMARY_TOKEN_BUDGET = 250   # rolling summary of everything older
 # ----------------------------
 
 # ----------------------------------------------------------------------
@@ -83,6 +93,10 @@ if 'pending_query' not in st.session_state:
     st.session_state.pending_query = None
 if 'dashboard_section' not in st.session_state:
     st.session_state.dashboard_section = "overview"
+if 'stream_responses' not in st.session_state:
+    st.session_state.stream_responses = True
+if 'metric_tables' not in st.session_state:
+    st.session_state.metric_tables = None
 
 # ----------------------------------------------------------------------
 # Helper Functions
@@ -97,6 +111,7 @@ def load_data() -> pd.DataFrame:
         df = pd.read_csv(file_path)
         df['date'] = pd.to_datetime(df['date'])
         st.session_state.sales_data = df
+        st.session_state.metric_tables = build_metric_tables(df)
         st.session_state.data_loaded = True
         return df
     except Exception as e:
@@ -258,13 +273,104 @@ def create_visualizations(data: pd.DataFrame):
     elif section == "customers":
         create_customer_analysis(data)
 
+# ----------------------------------------------------------------------
+# Grounded Metrics Retrieval (precomputed aggregates injected into the prompt)
+# ----------------------------------------------------------------------
+def build_metric_tables(data: pd.DataFrame) -> dict:
+    """Aggregates the assistant can cite, computed once per data load"""
+    def by(dim):
+        g = data.groupby(dim).agg(revenue=('revenue', 'sum'), profit=('profit', 'sum'),
+                                  margin=('profit_margin', 'mean'), transactions=('revenue', 'size'))
+        g['share'] = g['revenue'] / g['revenue'].sum() * 100
+        return g.sort_values('revenue', ascending=False)
+
+    monthly = data.groupby(data['date'].dt.to_period('M'))['revenue'].sum()
+    # Calendar-daily revenue (zero on days without sales), so forecast windows are real days
+    daily = data.set_index('date')['revenue'].resample('D').sum()
+    return {
+        'totals': {
+            'revenue': data['revenue'].sum(),
+            'profit': data['profit'].sum(),
+            'margin': data['profit_margin'].mean(),
+            'transactions': len(data),
+            'start': data['date'].min().date(),
+            'end': data['date'].max().date(),
+        },
+        'division': by('business_division'),
+        'region': by('region'),
+        'product': by('product'),
+        'segment': by('customer_segment'),
+        'monthly': monthly.tail(12),
+        # Mean revenue per day over the last two 30-day windows (PredictiveAgent's basis)
+        'recent_daily': daily.tail(30).mean(),
+        'previous_daily': daily.iloc[-60:-30].mean() if len(daily) >= 60 else None,
+    }
+
+# Same routing table as chatbot_ui.process_query; handlers unused, only the matches are
+intent_router = IntentRouter()
+for name, route in SALES_INTENTS.items():
+    intent_router.register(name, None, **route)
+
+def detect_intents(query: str) -> list:
+    """
+    Maps a query to (intent, params) pairs with chatbot_ui's intent keywords; unlike
+    that router, every matching intent is kept so mixed questions get every table they need.
+    """
+    return [(route.name, params) for route, params in intent_router.resolve_all(query)]
+
+def format_table(title: str, rows: list, header: list) -> str:
+    """Pipe-separated table: compact to send, easy for the model to read"""
+    lines = [title, " | ".join(header)]
+    lines += [" | ".join(str(v) for v in row) for row in rows]
+    return "\n".join(lines)
+
+def breakdown_table(title: str, frame: pd.DataFrame, limit: int = None) -> str:
+    frame = frame.head(limit) if limit else frame
+    rows = [(name, f"{r.revenue:,.0f}", f"{r.share:.1f}", f"{r.margin:.2f}", f"{int(r.transactions):,}")
+            for name, r in frame.iterrows()]
+    return format_table(title, rows, ["name", "revenue ৳", "share %", "avg margin %", "transactions"])
+
+def retrieve_context(query: str, tables: dict) -> tuple:
+    """
+    Compact data context for a query: only the precomputed tables its intents need,
+    never raw rows. Returns (context text, intent names used).
+    """
+    if not tables:
+        return "", []
+    t = tables['totals']
+    intents = detect_intents(query)
+    sections = [f"Totals ({t['start']} to {t['end']}): revenue ৳{t['revenue']:,.0f}, profit ৳{t['profit']:,.0f}, "
+                f"avg margin {t['margin']:.2f}%, {t['transactions']:,} transactions"]
+    for intent, params in intents:
+        if intent == 'top_products':
+            sections.append(breakdown_table(f"Top {params['x']} products by revenue:", tables['product'], params['x']))
+        elif intent == 'division':
+            sections.append(breakdown_table("Revenue by business division:", tables['division']))
+        elif intent == 'region':
+            sections.append(breakdown_table("Revenue by region:", tables['region']))
+        elif intent == 'segments':
+            sections.append(breakdown_table("Revenue by customer segment:", tables['segment']))
+        elif intent == 'profit_margin':
+            rows = [(name, f"{r.margin:.2f}", f"{r.profit:,.0f}") for name, r in tables['division'].iterrows()]
+            sections.append(format_table("Margin by business division:", rows, ["division", "avg margin %", "profit ৳"]))
+        elif intent == 'trend':
+            rows = [(str(month), f"{rev:,.0f}") for month, rev in tables['monthly'].items()]
+            sections.append(format_table("Monthly revenue (last 12 months):", rows, ["month", "revenue ৳"]))
+        elif intent == 'forecast':
+            days, recent, prev = params['days'], tables['recent_daily'], tables['previous_daily']
+            growth = (recent - prev) / prev if prev else 0
+            previous = f"previous 30 days ৳{prev:,.0f}/day" if prev is not None else "no previous 30 days"
+            sections.append(f"{days}-day revenue forecast: ৳{recent * days * (1 + growth):,.0f} "
+                            f"(last 30 days ৳{recent:,.0f}/day, {previous}, growth {growth * 100:+.2f}%)")
+    return "\n\n".join(sections), [intent for intent, _ in intents]
+
 # ----------------------------------------------------------------------
 # OLLAMA LLM INTEGRATION FUNCTION (Replaced old rule-based function)
 # ----------------------------------------------------------------------
-def process_query(query: str, history: list) -> str:
+def build_messages(query: str, history: list) -> tuple:
     """
-    Sends query to Ollama LLM with system context and chat history 
-    for contextual and generative responses.
+    Builds the Ollama message list: system context (with the retrieved data tables),
+    chat history, then the new query. Returns (messages, intents the data was retrieved for).
     """
 
     # 1. System Prompt to provide context and define the LLM persona/role
@@ -276,6 +382,13 @@ def process_query(query: str, history: list) -> str:
         "Keep your responses focused on sales, revenue, profit, and trends."
     ).format(current_date=datetime.now().strftime('%Y-%m-%d'))
 
+    context, grounded = retrieve_context(query, st.session_state.metric_tables)
+    if context:
+        system_prompt += (
+            "\n\nAnswer from the DATA below (Bangladeshi Taka, ৳). Quote these figures exactly; "
+            "if a figure you need is not in it, say so instead of estimating.\n\nDATA:\n" + context
+        )
+
     # 2. Format messages for Ollama API
     messages = [{"role": "system", "content": system_prompt}]
     
@@ -285,20 +398,212 @@ def process_query(query: str, history: list) -> str:
         
     # Append the new user query
     messages.append({"role": "user", "content": query})
-    
+    return messages, grounded
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token: close enough for budgeting without loading a tokenizer"""
+    return len(text) // 4 + 1
+
+def message_tokens(msg: dict) -> int:
+    return estimate_tokens(msg["content"]) + 4  # role + chat-template overhead
+
+class ChatContextWindow:
+    """
+    Keeps the history sent to the LLM within a token budget.
+    The newest turns go out verbatim; once they exceed the budget, the oldest are folded
+    out until only half the budget remains, so per-request prompt size stays flat in long
+    sessions. Folding is verbatim text on the request path (no model call); refresh(),
+    run after the reply, condenses the folded turns into the rolling summary in a
+    background thread, and the next request sends whichever summary is ready.
+    """
+
+    def __init__(self, budget: int = HISTORY_TOKEN_BUDGET, summary_budget: int = SUMMARY_TOKEN_BUDGET):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.summary = ""       # condensed by the model
+        self.unsummarized = ""  # folded turns not condensed yet
+        self.folded = 0  # chat_history messages already folded out
+        self.generation = 0  # bumped when the history is cleared; stale refreshes are dropped
+        self._lock = threading.Lock()
+        self._refresh = None
+
+    def fit(self, history: list) -> list:
+        """History to send: the rolling summary (if any) plus the newest turns within budget"""
+        if self.folded > len(history):  # history was cleared
+            with self._lock:
+                self.summary, self.unsummarized, self.folded = "", "", 0
+                self.generation += 1
+        recent = history[self.folded:]
+
+        if sum(message_tokens(m) for m in recent) > self.budget:
+            kept, tokens = 0, 0
+            for msg in reversed(recent):
+                tokens += message_tokens(msg)
+                if tokens > self.budget // 2:
+                    break
+                kept += 1
+            fold = len(recent) - kept
+            self._fold(recent[:fold])
+            self.folded += fold
+            recent = recent[fold:]
+
+        messages = [{"role": m["role"], "content": m["content"]} for m in recent]
+        summary = self.summary_text()
+        if summary:
+            messages.insert(0, {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        return messages
+
+    def _fold(self, messages: list):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        with self._lock:
+            self.unsummarized = f"{self.unsummarized}\n{transcript}".strip()
+            if not self.refreshing():  # bounded when no model condenses it: newest text wins
+                self.unsummarized = self.unsummarized[-self.budget * 4:]
+
+    def summary_text(self) -> str:
+        with self._lock:
+            summary = f"{self.summary}\n{self.unsummarized}".strip()
+        max_chars = self.summary_budget * 4
+        return summary if len(summary) <= max_chars else "…" + summary[-max_chars:]
+
+    def refreshing(self) -> bool:
+        return self._refresh is not None and self._refresh.is_alive()
+
+    def refresh(self):
+        """Condense the folded turns into the summary with the model, in a background thread"""
+        with self._lock:
+            if not self.unsummarized or self.refreshing():
+                return
+            args = (self.summary, self.unsummarized, self.generation)
+            self._refresh = threading.Thread(target=self._condense, args=args, daemon=True)
+            self._refresh.start()
+
+    def _condense(self, summary: str, turns: str, generation: int):
+        try:
+            response = ollama.chat(model=OLLAMA_MODEL, stream=False, messages=[
+                {"role": "system", "content": (
+                    f"Condense this sales-assistant conversation into at most {self.summary_budget * 3 // 4} words. "
+                    "Keep every figure, product, region and conclusion that was mentioned.")},
+                {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{turns}"}
+            ])
+            condensed = response['message']['content']
+        except Exception:
+            return  # no model: the folded turns stay in the summary verbatim
+        max_chars = self.summary_budget * 4
+        with self._lock:
+            if generation != self.generation:
+                return
+            self.summary = condensed if len(condensed) <= max_chars else "…" + condensed[-max_chars:]
+            # Turns folded while the model was condensing are kept for the next refresh
+            self.unsummarized = self.unsummarized[len(turns):].strip()
+
+if 'context_window' not in st.session_state:
+    st.session_state.context_window = ChatContextWindow()
+
+def ollama_error_message(e: Exception) -> str:
+    return f"🚨 **Ollama Error:** Could not connect to the model (`{OLLAMA_MODEL}`). Ensure Ollama is running (`ollama serve`) and the model is pulled (`ollama pull {OLLAMA_MODEL}`). Error: {e}"
+
+def process_query(messages: list) -> str:
+    """
+    Sends the query messages (system context, chat history, query; see build_messages)
+    to the Ollama LLM for contextual and generative responses.
+    """
     # 3. Call Ollama API
     try:
         response = ollama.chat(
             model=OLLAMA_MODEL, 
             messages=messages, 
-            stream=False # Using non-streaming for simpler integration with current UI logic
+            stream=False
         )
         
         # 4. Extract content
         return response['message']['content']
 
     except Exception as e:
-        return f"🚨 **Ollama Error:** Could not connect to the model (`{OLLAMA_MODEL}`). Ensure Ollama is running (`ollama serve`) and the model is pulled (`ollama pull {OLLAMA_MODEL}`). Error: {e}"
+        return ollama_error_message(e)
+
+def stream_query(messages: list, metrics: dict):
+    """
+    Streaming variant of process_query: yields response tokens as Ollama produces them.
+    Fills `metrics` with time-to-first-token, token count, tokens/sec and total time.
+    """
+    start = time.perf_counter()
+    chunks = 0
+    try:
+        for chunk in ollama.chat(model=OLLAMA_MODEL, messages=messages, stream=True):
+            token = chunk['message']['content']
+            if token:
+                chunks += 1
+                metrics.setdefault('ttft', time.perf_counter() - start)
+            if chunk.get('done') and chunk.get('eval_duration'):
+                # Ollama's own generation counters (eval_duration is in nanoseconds)
+                metrics['tokens'] = chunk['eval_count']
+                metrics['tokens_per_sec'] = chunk['eval_count'] / (chunk['eval_duration'] / 1e9)
+            yield token
+    except Exception as e:
+        yield ollama_error_message(e)
+    metrics['total'] = time.perf_counter() - start
+    if 'tokens_per_sec' not in metrics and chunks:
+        generating = metrics['total'] - metrics.get('ttft', 0)
+        metrics['tokens'] = chunks
+        metrics['tokens_per_sec'] = chunks / generating if generating > 0 else 0.0
+
+def format_metrics(metrics: dict) -> str:
+    parts = []
+    if 'prompt_tokens' in metrics:
+        parts.append(f"📨 ~{metrics['prompt_tokens']} tokens sent")
+    if metrics.get('grounded'):
+        parts.append("📊 " + ", ".join(metrics['grounded']))
+    if 'ttft' in metrics:
+        parts += [f"⚡ first token {metrics['ttft']:.2f}s",
+                  f"{metrics.get('tokens_per_sec', 0):.1f} tok/s",
+                  f"{metrics.get('tokens', 0)} tokens"]
+    parts.append(f"{metrics.get('total', 0):.2f}s total")
+    return " · ".join(parts)
+
+def render_user_message(content: str):
+    st.markdown(f'<div class="chat-message user-message">**You:** {content}</div>', unsafe_allow_html=True)
+
+def render_assistant_message(content: str, metrics: dict = None, cursor: bool = False):
+    st.markdown(f'<div class="chat-message assistant-message">**Assistant:**\n\n{content}{"▌" if cursor else ""}</div>', unsafe_allow_html=True)
+    if metrics:
+        st.caption(format_metrics(metrics))
+
+def answer_query(query: str, history: list) -> dict:
+    """
+    Runs a query through Ollama and returns the assistant chat message.
+    History is trimmed to the token budget first (the summary of folded turns is refreshed
+    in the background after the reply); the prompt and its data grounding are built once,
+    and the message records the tokens sent.
+    In streaming mode tokens are rendered as they arrive (redraws throttled to ~20/s)
+    and the message also carries its TTFT / tokens-per-second metrics.
+    """
+    history = st.session_state.context_window.fit(history)
+    messages, grounded = build_messages(query, history)
+    prompt_tokens = sum(message_tokens(m) for m in messages)
+
+    if not st.session_state.stream_responses:
+        start = time.perf_counter()
+        with st.spinner(f"Querying {OLLAMA_MODEL}..."):
+            content = process_query(messages)
+        metrics = {"prompt_tokens": prompt_tokens, "grounded": grounded, "total": time.perf_counter() - start}
+        st.session_state.context_window.refresh()
+        return {"role": "assistant", "content": content, "metrics": metrics}
+
+    slot = st.empty()
+    metrics, text, last_draw = {"prompt_tokens": prompt_tokens, "grounded": grounded}, "", 0.0
+    with slot.container():
+        render_user_message(query)
+        body = st.empty()
+        for token in stream_query(messages, metrics):
+            text += token
+            if time.perf_counter() - last_draw > 0.05:
+                with body.container():
+                    render_assistant_message(text, cursor=True)
+                last_draw = time.perf_counter()
+    slot.empty()  # the finished message is rendered from chat history
+    st.session_state.context_window.refresh()
+    return {"role": "assistant", "content": text, "metrics": metrics}
 # ----------------------------------------------------------------------
 
 
@@ -314,6 +619,10 @@ with st.sidebar:
         if st.session_state.data_loaded:
             st.success("✅ Data loaded!")
 
+    st.toggle("⚡ Stream responses", key="stream_responses")
+    if st.session_state.context_window.folded:
+        st.caption(f"🧠 {st.session_state.context_window.folded} earlier messages condensed into a summary")
+
     if st.session_state.data_loaded:
         d = st.session_state.sales_data
         st.success("✅ System Ready (Ollama: " + OLLAMA_MODEL + ")") # Display model name
@@ -381,14 +690,11 @@ if st.session_state.pending_query:
     # Use the existing chat history (before adding the pending query)
     history_for_llm = st.session_state.chat_history.copy()
     
-    # NEW CALL SITE: Use the Ollama function
-    with st.spinner(f"Querying {OLLAMA_MODEL}..."):
-        # The new function only needs the query and the existing history
-        resp = process_query(q, history_for_llm) 
+    resp = answer_query(q, history_for_llm)
 
     st.session_state.chat_history.extend([
         {"role": "user", "content": q},
-        {"role": "assistant", "content": resp}
+        resp
     ])
     st.session_state.pending_query = None
 
@@ -412,9 +718,9 @@ if st.session_state.active_tab == "chat":
 
     for msg in st.session_state.chat_history:
         if msg["role"] == "user":
-            st.markdown(f'<div class="chat-message user-message">**You:** {msg["content"]}</div>', unsafe_allow_html=True)
+            render_user_message(msg["content"])
         else:
-            st.markdown(f'<div class="chat-message assistant-message">**Assistant:**\n\n{msg["content"]}</div>', unsafe_allow_html=True)
+            render_assistant_message(msg["content"], msg.get("metrics"))
 
     with st.form(key="chat_form", clear_on_submit=True):
         user_input = st.text_input("Ask a question:", placeholder="e.g., top 5 products, Explain regional trends.")
@@ -424,13 +730,9 @@ if st.session_state.active_tab == "chat":
         # Append user message immediately
         st.session_state.chat_history.append({"role": "user", "content": user_input})
         
-        # NEW CALL SITE: Use the Ollama function
-        with st.spinner(f"Querying {OLLAMA_MODEL}..."):
-            # Pass the new user input, and all messages *before* the latest one as history
-            history_for_llm = st.session_state.chat_history[:-1]
-            response = process_query(user_input, history_for_llm)
-            
-        st.session_state.chat_history.append({"role": "assistant", "content": response})
+        # Pass the new user input, and all messages *before* the latest one as history
+        history_for_llm = st.session_state.chat_history[:-1]
+        st.session_state.chat_history.append(answer_query(user_input, history_for_llm))
         st.rerun()
 
 # ----------------------------------------------------------------------
@@ -57,6 +57,20 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Tuple
 import json
 import warnings
+import os
+import shutil
+import time
+import hashlib
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.feather as pa_feather
+try:
+    from scipy import sparse
+    from scipy.sparse.linalg import splu
+except ImportError:  # hierarchy reconciliation falls back to dense NumPy
+    sparse = None
 
 import json
 import pandas as pd
@@ -65,6 +79,9 @@ from typing import Dict, Any
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
 
+# Load-test cells (1M-row streaming, sharded generation) only run with RUN_BENCHMARKS=1
+RUN_BENCHMARKS = os.environ.get('RUN_BENCHMARKS') == '1'
+
 
 # In[5]:
 
@@ -90,6 +107,56 @@ print("="*80)
 class SalesDataGenerator:
     """Generate realistic sales dataset with complete Akij Resource product portfolio"""
 
+    # Complete Akij Resource Product Portfolio organized by Business Division
+    AKIJ_PRODUCTS = {
+        'Beverages & Food': [
+            'Mojo', 'Frutika (Juice)', 'Speed (Energy Drink)', 'Clemon', 'Twing', 'Lemu', 
+            'Royal Tiger', 'Spa Drinking Water', 'Yummy Lassi', 'Farm Fresh Milk (UHT)', 
+            'Farm Fresh Ghee', 'Akij Daily Spices', 'Akij Daily Edible Oil', 'Akij Tea',
+            'Aafi Snacks (Chanachur)', 'O\'Potato Chips', 'Happy Times Jam', 
+            'Bakeman\'s Biscuits', 'Funtastic Chocolate', 'Akij Flour (Atta)', 
+            'Akij Maida', 'Akij Suji', 'Akij Muri (Puffed Rice)', 'Essential Chinigura Rice',
+            'Akij Bakers Bread', 'Akij Bakers Bun', 'Akij Bakers Cake'
+        ],
+        'Building & Construction': [
+            'Akij Cement (PCC/CEM-I)', 'Akij Ceramics Tiles (Wall/Floor/Stair)', 
+            'Kathena Tiles', 'Sierra Tiles', 'Espacio Tiles', 'Rosa Sanitaryware',
+            'Akij Board (Particle Board/MDF)', 'Akij Door (Laminated)', 'Akij Door (Solid)',
+            'Akij Pipes & Fittings', 'Akij Buildtech', 'Akij Rebar (TMT)'
+        ],
+        'FMCG & Household': [
+            'Max Wash Detergent Powder', 'Dish Master (Liquid)', 'Dish Master (Bar)',
+            'Fantastik Air Freshener', 'H&H Hand Wash', 'Mum Mum Baby Diaper',
+            'Akij Daily Home Care Products', 'Akij Plastics Furniture', 
+            'Akij Plastics Household Items'
+        ],
+        'Industrial & Other': [
+            'Akij Jute Yarn', 'Akij Jute Sacks', 'Akij Textile Woven Fabric', 
+            'Akij Textile Denim', 'Akij Tableware (Porcelain)', 
+            'Akij Motors Electric Bike', 'Akij Motors Three-Wheeler',
+            'AKIJ Power Light LED Bulb', 'AKIJ Fan (Ceiling Fan)', 
+            'AKIJ AURA Switch', 'AKIJ DELIGHT Socket', 'Akij Electrical Cables',
+            'AKIJ Circuit Breaker (MCB)', 'Akij BIAX Films (BOPET)', 
+            'Akij BIAX Films (CPP)', 'Akij Printing & Packaging',
+            'Akij Pharma Medicine', 'Akij Footwear', 'BONN Bicycle', 'B\'FIRE Bicycle'
+        ]
+    }
+
+    # Beverages & Food: 40%, Building & Construction: 30%, FMCG: 20%, Industrial: 10%
+    DIVISION_WEIGHTS = {
+        'Beverages & Food': 0.40,
+        'Building & Construction': 0.30,
+        'FMCG & Household': 0.20,
+        'Industrial & Other': 0.10
+    }
+
+    SEGMENTS = ['Enterprise', 'SMB', 'Individual', 'Government', 'Retail Distributor', 'Wholesaler']
+    SEGMENT_WEIGHTS = [0.20, 0.25, 0.25, 0.08, 0.12, 0.10]
+    REGIONS = ['Dhaka', 'Chittagong', 'Rangpur', 'Khulna', 'Mymensingh', 'Rajshahi', 'Sylhet', 'Barisal']
+    REGION_WEIGHTS = [0.28, 0.20, 0.10, 0.12, 0.08, 0.10, 0.07, 0.05]
+    CHANNELS = ['Online', 'Retail Store', 'Wholesale', 'Direct Sales', 'Distributor Network']
+    CHANNEL_WEIGHTS = [0.25, 0.25, 0.20, 0.15, 0.15]
+
     @staticmethod
     def generate_sales_data(num_records: int = 4000) -> pd.DataFrame:
         """
@@ -97,40 +164,7 @@ class SalesDataGenerator:
         """
         np.random.seed(42)
 
-        # Complete Akij Resource Product Portfolio organized by Business Division
-        akij_products = {
-            'Beverages & Food': [
-                'Mojo', 'Frutika (Juice)', 'Speed (Energy Drink)', 'Clemon', 'Twing', 'Lemu', 
-                'Royal Tiger', 'Spa Drinking Water', 'Yummy Lassi', 'Farm Fresh Milk (UHT)', 
-                'Farm Fresh Ghee', 'Akij Daily Spices', 'Akij Daily Edible Oil', 'Akij Tea',
-                'Aafi Snacks (Chanachur)', 'O\'Potato Chips', 'Happy Times Jam', 
-                'Bakeman\'s Biscuits', 'Funtastic Chocolate', 'Akij Flour (Atta)', 
-                'Akij Maida', 'Akij Suji', 'Akij Muri (Puffed Rice)', 'Essential Chinigura Rice',
-                'Akij Bakers Bread', 'Akij Bakers Bun', 'Akij Bakers Cake'
-            ],
-            'Building & Construction': [
-                'Akij Cement (PCC/CEM-I)', 'Akij Ceramics Tiles (Wall/Floor/Stair)', 
-                'Kathena Tiles', 'Sierra Tiles', 'Espacio Tiles', 'Rosa Sanitaryware',
-                'Akij Board (Particle Board/MDF)', 'Akij Door (Laminated)', 'Akij Door (Solid)',
-                'Akij Pipes & Fittings', 'Akij Buildtech', 'Akij Rebar (TMT)'
-            ],
-            'FMCG & Household': [
-                'Max Wash Detergent Powder', 'Dish Master (Liquid)', 'Dish Master (Bar)',
-                'Fantastik Air Freshener', 'H&H Hand Wash', 'Mum Mum Baby Diaper',
-                'Akij Daily Home Care Products', 'Akij Plastics Furniture', 
-                'Akij Plastics Household Items'
-            ],
-            'Industrial & Other': [
-                'Akij Jute Yarn', 'Akij Jute Sacks', 'Akij Textile Woven Fabric', 
-                'Akij Textile Denim', 'Akij Tableware (Porcelain)', 
-                'Akij Motors Electric Bike', 'Akij Motors Three-Wheeler',
-                'AKIJ Power Light LED Bulb', 'AKIJ Fan (Ceiling Fan)', 
-                'AKIJ AURA Switch', 'AKIJ DELIGHT Socket', 'Akij Electrical Cables',
-                'AKIJ Circuit Breaker (MCB)', 'Akij BIAX Films (BOPET)', 
-                'Akij BIAX Films (CPP)', 'Akij Printing & Packaging',
-                'Akij Pharma Medicine', 'Akij Footwear', 'BONN Bicycle', 'B\'FIRE Bicycle'
-            ]
-        }
+        akij_products = SalesDataGenerator.AKIJ_PRODUCTS
 
         # Flatten to get all products and create division mapping
         all_products = []
@@ -147,13 +181,7 @@ class SalesDataGenerator:
         print(f"🏢 Business Divisions: {len(akij_products)}")
 
         # Create weighted distribution for products
-        # Beverages & Food: 40%, Building & Construction: 30%, FMCG: 20%, Industrial: 10%
-        division_weights = {
-            'Beverages & Food': 0.40,
-            'Building & Construction': 0.30,
-            'FMCG & Household': 0.20,
-            'Industrial & Other': 0.10
-        }
+        division_weights = SalesDataGenerator.DIVISION_WEIGHTS
 
         # Calculate individual product weights
         product_weights = []
@@ -169,9 +197,9 @@ class SalesDataGenerator:
         product_weights = product_weights / product_weights.sum()
 
         # Other dimensions
-        segments = ['Enterprise', 'SMB', 'Individual', 'Government', 'Retail Distributor', 'Wholesaler']
-        regions = ['Dhaka', 'Chittagong', 'Rangpur', 'Khulna', 'Mymensingh', 'Rajshahi', 'Sylhet', 'Barisal']
-        channels = ['Online', 'Retail Store', 'Wholesale', 'Direct Sales', 'Distributor Network']
+        segments = SalesDataGenerator.SEGMENTS
+        regions = SalesDataGenerator.REGIONS
+        channels = SalesDataGenerator.CHANNELS
 
         # Generate date range - up to today (November 5, 2025)
         # end_date = datetime(2025, 11, 5)  # Today's date
@@ -185,9 +213,9 @@ class SalesDataGenerator:
             'transaction_id': [f'AKJ{str(i).zfill(7)}' for i in range(1, num_records + 1)],
             'date': np.random.choice(dates, num_records),
             'product': np.random.choice(all_products, num_records, p=product_weights),
-            'customer_segment': np.random.choice(segments, num_records, p=[0.20, 0.25, 0.25, 0.08, 0.12, 0.10]),
-            'region': np.random.choice(regions, num_records, p=[0.28, 0.20, 0.10, 0.12, 0.08, 0.10, 0.07, 0.05]),
-            'sales_channel': np.random.choice(channels, num_records, p=[0.25, 0.25, 0.20, 0.15, 0.15]),
+            'customer_segment': np.random.choice(segments, num_records, p=SalesDataGenerator.SEGMENT_WEIGHTS),
+            'region': np.random.choice(regions, num_records, p=SalesDataGenerator.REGION_WEIGHTS),
+            'sales_channel': np.random.choice(channels, num_records, p=SalesDataGenerator.CHANNEL_WEIGHTS),
         }
 
         df = pd.DataFrame(data)
@@ -316,8 +344,290 @@ class SalesDataGenerator:
         # Sort by date
         df = df.sort_values('date').reset_index(drop=True)
 
+        # Convert to the compact canonical schema
+        compact = SalesSchema.apply(df)
+        print(SalesSchema.memory_report(df, compact))
+
+        return compact
+
+    # Per-division ranges used by the vectorized (streaming) generator.
+    # Order follows AKIJ_PRODUCTS so a division code indexes straight into each table.
+    DIVISION_REVENUE_RANGE = {
+        'Beverages & Food': (0.6, 1.2),
+        'Building & Construction': (2.0, 3.5),
+        'FMCG & Household': (0.5, 1.0),
+        'Industrial & Other': (1.5, 2.5)
+    }
+    DIVISION_QUANTITY_RANGE = {
+        'Beverages & Food': (100, 1000),
+        'Building & Construction': (10, 200),
+        'FMCG & Household': (100, 1000),
+        'Industrial & Other': (1, 100)
+    }
+    DIVISION_COST_RANGE = {
+        'Beverages & Food': (0.65, 0.75),
+        'Building & Construction': (0.60, 0.70),
+        'FMCG & Household': (0.70, 0.80),
+        'Industrial & Other': (0.55, 0.65)
+    }
+    SEGMENT_REVENUE_MULTIPLIER = {'Enterprise': 1.5, 'Government': 1.4, 'Wholesaler': 1.3}
+    REGION_REVENUE_MULTIPLIER = {'Dhaka': 1.3, 'Chittagong': 1.3}
+    MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                   'August', 'September', 'October', 'November', 'December']
+
+    @staticmethod
+    def build_lookup_tables(end_date: datetime = None, history_days: int = 730) -> Dict[str, Any]:
+        """
+        Precompute every per-category and per-day lookup table the streaming generator needs,
+        so each chunk is generated with integer codes and array indexing only
+        """
+        gen = SalesDataGenerator
+        divisions = list(gen.AKIJ_PRODUCTS)
+        products = [p for div in divisions for p in gen.AKIJ_PRODUCTS[div]]
+        product_division = np.array(
+            [i for i, div in enumerate(divisions) for _ in gen.AKIJ_PRODUCTS[div]], dtype=np.int8
+        )
+
+        product_weights = np.array([
+            gen.DIVISION_WEIGHTS[divisions[d]] / len(gen.AKIJ_PRODUCTS[divisions[d]])
+            for d in product_division
+        ])
+        product_weights = product_weights / product_weights.sum()
+
+        def division_table(ranges):
+            return np.array([ranges[div] for div in divisions]).T
+
+        # Seasonal multiplier per (product, month): same rules as generate_sales_data
+        seasonal = np.ones((len(products), 13))
+        summer_drinks = pd.Series(products).str.contains(
+            'Mojo|Frutika|Speed|Clemon|Twing|Lemu|Spa', case=False).to_numpy()
+        is_division = {div: product_division == i for i, div in enumerate(divisions)}
+        seasonal[np.ix_(is_division['Beverages & Food'] & summer_drinks, [4, 5, 6, 7])] = 1.4
+        seasonal[np.ix_(is_division['Building & Construction'], [11, 12, 1, 2, 3])] = 1.3
+        seasonal[np.ix_(is_division['FMCG & Household'], [3, 4, 8, 9])] = 1.2
+
+        # Calendar attributes per day offset
+        end_day = pd.Timestamp(end_date or datetime.now()).normalize()
+        calendar = pd.date_range(end_day - pd.Timedelta(days=history_days), end_day, freq='D')
+
+        return {
+            'divisions': divisions,
+            'products': products,
+            'product_division': product_division,
+            'product_weights': product_weights,
+            'revenue_range': division_table(gen.DIVISION_REVENUE_RANGE),
+            'quantity_range': division_table(gen.DIVISION_QUANTITY_RANGE),
+            'cost_range': division_table(gen.DIVISION_COST_RANGE),
+            'segment_multiplier': np.array([gen.SEGMENT_REVENUE_MULTIPLIER.get(s, 1.0) for s in gen.SEGMENTS]),
+            'region_multiplier': np.array([gen.REGION_REVENUE_MULTIPLIER.get(r, 1.0) for r in gen.REGIONS]),
+            'seasonal': seasonal,
+            'calendar': calendar.values,
+            'day_month': calendar.month.values.astype(np.int8),
+            'day_quarter': calendar.quarter.values.astype(np.int8),
+            'day_year': calendar.year.values.astype(np.int16),
+            'day_week': calendar.isocalendar().week.values.astype(np.int8)
+        }
+
+    @staticmethod
+    def generate_chunk(rng: np.random.Generator, tables: Dict[str, Any],
+                       first_id: int, size: int) -> pd.DataFrame:
+        """
+        Generate one chunk of transactions with NumPy-only operations
+
+        Transaction ids are the integer part of the AKJ####### ids (first_id + 1 ...),
+        categorical columns are built straight from integer codes.
+        """
+        gen = SalesDataGenerator
+        total_days = len(tables['calendar'])
+
+        # Day offsets drawn as per-day counts, so the chunk comes out date-sorted without a sort
+        day = np.repeat(np.arange(total_days), rng.multinomial(size, np.full(total_days, 1 / total_days)))
+        product = rng.choice(len(tables['products']), size, p=tables['product_weights'])
+        segment = rng.choice(len(gen.SEGMENTS), size, p=gen.SEGMENT_WEIGHTS)
+        region = rng.choice(len(gen.REGIONS), size, p=gen.REGION_WEIGHTS)
+        channel = rng.choice(len(gen.CHANNELS), size, p=gen.CHANNEL_WEIGHTS)
+        division = tables['product_division'][product]
+
+        low, high = tables['revenue_range'][:, division]
+        revenue = rng.uniform(500, 50000, size) * rng.uniform(low, high)
+        revenue *= tables['segment_multiplier'][segment] * tables['region_multiplier'][region]
+
+        low, high = tables['quantity_range'][:, division]
+        quantity = rng.integers(low.astype(np.int64), high.astype(np.int64))
+        unit_price = revenue / quantity
+
+        low, high = tables['cost_range'][:, division]
+        cost = revenue * rng.uniform(low, high)
+
+        # Seasonal adjustment applied after costing, as in generate_sales_data
+        month = tables['day_month'][day]
+        revenue *= tables['seasonal'][product, month]
+        profit = revenue - cost
+
+        return SalesSchema.apply(pd.DataFrame({
+            'transaction_id': np.arange(first_id + 1, first_id + size + 1, dtype=np.int64),
+            'date': tables['calendar'][day],
+            'product': pd.Categorical.from_codes(product, tables['products']),
+            'customer_segment': pd.Categorical.from_codes(segment, gen.SEGMENTS),
+            'region': pd.Categorical.from_codes(region, gen.REGIONS),
+            'sales_channel': pd.Categorical.from_codes(channel, gen.CHANNELS),
+            'business_division': pd.Categorical.from_codes(division, tables['divisions']),
+            'revenue': revenue,
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'cost': cost,
+            'profit': profit,
+            'profit_margin': profit / revenue * 100,
+            'month': month,
+            'quarter': tables['day_quarter'][day],
+            'year': tables['day_year'][day],
+            'month_name': pd.Categorical.from_codes(month - 1, gen.MONTH_NAMES),
+            'week': tables['day_week'][day]
+        }))
+
+    @staticmethod
+    def chunk_seeds(num_records: int, chunk_size: int, seed: int = 42) -> List[np.random.SeedSequence]:
+        """One independent SeedSequence per chunk, so any chunk can be generated on its own"""
+        num_chunks = -(-num_records // chunk_size)
+        return np.random.SeedSequence(seed).spawn(num_chunks)
+
+    @staticmethod
+    def iter_sales_chunks(num_records: int, chunk_size: int = 1_000_000,
+                          seed: int = 42, end_date: datetime = None):
+        """
+        Stream synthetic sales data in fixed-size chunks (bounded memory, for load testing)
+
+        Yields DataFrames of at most chunk_size rows; only one chunk is alive at a time.
+        Chunk i depends only on (seed, chunk_size, i), never on the chunks before it.
+        """
+        tables = SalesDataGenerator.build_lookup_tables(end_date)
+        seeds = SalesDataGenerator.chunk_seeds(num_records, chunk_size, seed)
+        for index, chunk_seed in enumerate(seeds):
+            first_id = index * chunk_size
+            size = min(chunk_size, num_records - first_id)
+            yield SalesDataGenerator.generate_chunk(np.random.default_rng(chunk_seed), tables, first_id, size)
+
+    @staticmethod
+    def generate_sales_data_sharded(num_records: int, output_dir: str, num_workers: int = None,
+                                    shard_size: int = 1_000_000, seed: int = 42,
+                                    end_date: datetime = None) -> List[str]:
+        """
+        Generate synthetic sales data in parallel, one Parquet partition file per shard
+
+        Shards are fixed-size and seeded from SeedSequence(seed).spawn(), so the merged
+        result is identical for a given seed whatever num_workers is (or whether shards are
+        written by forked processes or, where fork is unavailable, by threads).
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        end_date = pd.Timestamp(end_date or datetime.now()).normalize()
+        seeds = SalesDataGenerator.chunk_seeds(num_records, shard_size, seed)
+
+        tasks = [
+            (os.path.join(output_dir, f"part-{index:05d}.parquet"), shard_seed, index * shard_size,
+             min(shard_size, num_records - index * shard_size), end_date)
+            for index, shard_seed in enumerate(seeds)
+        ]
+        if 'fork' in mp.get_all_start_methods():
+            with process_pool(num_workers) as pool:
+                return list(pool.map(_write_sales_shard, tasks))
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            return list(pool.map(_write_sales_shard, tasks))
+
+    @staticmethod
+    def read_shards(output_dir: str) -> pd.DataFrame:
+        """Merge shard partition files back into one frame, in shard order"""
+        parts = sorted(f for f in os.listdir(output_dir) if f.startswith('part-') and f.endswith('.parquet'))
+        return pd.concat([pd.read_parquet(os.path.join(output_dir, f)) for f in parts], ignore_index=True)
+
+
+class SalesSchema:
+    """
+    Canonical compact in-memory schema for the transaction frame
+    - Dimension columns are categoricals over one fixed, shared dictionary
+      (so codes are identical across generated chunks, shards and reloads)
+    - transaction_id is the int32 numeric part of AKJ####### (export() restores the
+      string ids for CSV interchange)
+    - Per-row ratios (unit_price, profit_margin) are float32 in storage only: they are
+      cast to float64 before being averaged, so reported margins keep full precision;
+      revenue, cost and profit stay float64 because they are summed into report totals
+    - Calendar columns are int8/int16
+    """
+
+    CATEGORIES = {
+        'product': [p for products in SalesDataGenerator.AKIJ_PRODUCTS.values() for p in products],
+        'business_division': list(SalesDataGenerator.AKIJ_PRODUCTS),
+        'region': SalesDataGenerator.REGIONS,
+        'customer_segment': SalesDataGenerator.SEGMENTS,
+        'sales_channel': SalesDataGenerator.CHANNELS,
+        'month_name': SalesDataGenerator.MONTH_NAMES
+    }
+
+    DTYPES = {
+        'transaction_id': 'int32',
+        'quantity': 'int16',
+        'unit_price': 'float32',
+        'profit_margin': 'float32',
+        'month': 'int8',
+        'quarter': 'int8',
+        'year': 'int16',
+        'week': 'int8'
+    }
+
+    @staticmethod
+    def apply(df: pd.DataFrame) -> pd.DataFrame:
+        """Return the frame converted to the compact schema (columns it lacks are skipped)"""
+        converted = {}
+        for col, categories in SalesSchema.CATEGORIES.items():
+            if col in df.columns:
+                converted[col] = df[col].astype(pd.CategoricalDtype(categories))
+
+        for col, dtype in SalesSchema.DTYPES.items():
+            if col not in df.columns:
+                continue
+            values = df[col]
+            if col == 'transaction_id' and not pd.api.types.is_numeric_dtype(values):
+                values = values.str.slice(3)  # 'AKJ0000123' -> '0000123'
+            converted[col] = values.astype(dtype)
+
+        if 'date' in df.columns:
+            converted['date'] = pd.to_datetime(df['date'])
+
+        return df.assign(**converted)
+
+    @staticmethod
+    def export(df: pd.DataFrame) -> pd.DataFrame:
+        """Frame for interchange files (CSV): transaction ids back in their AKJ####### form"""
+        if 'transaction_id' in df.columns and pd.api.types.is_numeric_dtype(df['transaction_id']):
+            return df.assign(transaction_id='AKJ' + df['transaction_id'].astype(str).str.zfill(7))
         return df
 
+    @staticmethod
+    def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> str:
+        """Bytes per row before and after applying the schema"""
+        rows = max(len(before), 1)
+        before_bpr = before.memory_usage(deep=True).sum() / rows
+        after_bpr = after.memory_usage(deep=True).sum() / rows
+        return (f"💾 Compact schema: {before_bpr:,.1f} → {after_bpr:,.1f} bytes/row "
+                f"({before_bpr - after_bpr:,.1f} saved, {(1 - after_bpr / before_bpr) * 100:.1f}%)")
+
+
+def process_pool(max_workers: int = None) -> ProcessPoolExecutor:
+    """
+    Process pool for CPU-bound fan-out. Always forks, so workers inherit this notebook's
+    definitions: spawned workers would re-run the script on import (or, under Jupyter,
+    fail to find them). Callers check for fork first and fall back to threads without it.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context('fork'))
+
+
+def _write_sales_shard(task) -> str:
+    """Worker: generate one shard and write it to its own partition file"""
+    path, shard_seed, first_id, size, end_date = task
+    tables = SalesDataGenerator.build_lookup_tables(end_date)
+    shard = SalesDataGenerator.generate_chunk(np.random.default_rng(shard_seed), tables, first_id, size)
+    shard.to_parquet(path, index=False)
+    return path
+
 
 # In[8]:
 
@@ -327,6 +637,41 @@ print("\n🔄 Generating sales data...")
 sales_data = SalesDataGenerator.generate_sales_data(num_records=4000)
 
 
+# In[ ]:
+
+
+# Load-test mode: stream a larger synthetic history in bounded-memory chunks
+if RUN_BENCHMARKS:
+    stream_start = time.perf_counter()
+    streamed_rows = 0
+    for chunk in SalesDataGenerator.iter_sales_chunks(num_records=1_000_000, chunk_size=250_000):
+        streamed_rows += len(chunk)
+    stream_elapsed = time.perf_counter() - stream_start
+    print(f"⚡ Streaming generator: {streamed_rows:,} rows in {stream_elapsed:.2f}s "
+          f"({streamed_rows / stream_elapsed:,.0f} rows/s)")
+
+
+# In[ ]:
+
+
+# Parallel sharded mode: same seed, different worker counts, identical merged result
+if RUN_BENCHMARKS:
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as one_worker_dir, tempfile.TemporaryDirectory() as many_worker_dir:
+        shard_end = datetime.now()
+        SalesDataGenerator.generate_sales_data_sharded(200_000, one_worker_dir, num_workers=1,
+                                                       shard_size=50_000, end_date=shard_end)
+        shard_start = time.perf_counter()
+        shard_files = SalesDataGenerator.generate_sales_data_sharded(200_000, many_worker_dir, num_workers=4,
+                                                                     shard_size=50_000, end_date=shard_end)
+        shard_elapsed = time.perf_counter() - shard_start
+        reproducible = SalesDataGenerator.read_shards(one_worker_dir).equals(
+            SalesDataGenerator.read_shards(many_worker_dir))
+        print(f"🧩 Sharded generator: {len(shard_files)} partitions in {shard_elapsed:.2f}s "
+              f"(1 vs 4 workers identical: {reproducible})")
+
+
 # In[9]:
 
 
@@ -336,14 +681,14 @@ print(f"📆 Report Date: {datetime.now().strftime('%B %d, %Y')} (Today)")
 print(f"⏱️  Data Coverage: 2 years ({sales_data['date'].nunique()} days)")
 print(f"💰 Total Revenue: ৳{sales_data['revenue'].sum():,.2f}")
 print(f"💵 Total Profit: ৳{sales_data['profit'].sum():,.2f}")
-print(f"📊 Average Margin: {sales_data['profit_margin'].mean():.2f}%")
+print(f"📊 Average Margin: {sales_data['profit_margin'].astype('float64').mean():.2f}%")
 
 
 # In[10]:
 
 
 print(f"\n🏢 BUSINESS DIVISIONS:")
-division_summary = sales_data.groupby('business_division').agg({
+division_summary = sales_data.groupby('business_division', observed=True).agg({
     'revenue': 'sum',
     'transaction_id': 'count'
 }).round(2)
@@ -355,7 +700,7 @@ print(division_summary.to_string())
 
 
 print(f"\n📦 TOP 15 PRODUCTS BY REVENUE:")
-top_products = sales_data.groupby('product')['revenue'].sum().sort_values(ascending=False).head(15)
+top_products = sales_data.groupby('product', observed=True)['revenue'].sum().sort_values(ascending=False).head(15)
 for i, (product, revenue) in enumerate(top_products.items(), 1):
     print(f"  {i:2d}. {product:.<50} ৳{revenue:>12,.2f}")
 
@@ -364,7 +709,7 @@ for i, (product, revenue) in enumerate(top_products.items(), 1):
 
 
 print(f"\n🌍 REVENUE BY REGION:")
-region_summary = sales_data.groupby('region')['revenue'].sum().sort_values(ascending=False)
+region_summary = sales_data.groupby('region', observed=True)['revenue'].sum().sort_values(ascending=False)
 for region, revenue in region_summary.items():
     pct = (revenue / sales_data['revenue'].sum()) * 100
     print(f"  {region:.<25} ৳{revenue:>12,.2f} ({pct:>5.1f}%)")
@@ -380,9 +725,272 @@ print(sales_data[['transaction_id', 'date', 'product', 'business_division', 'reg
 # In[14]:
 
 
-# Save to CSV
-sales_data.to_csv('akij_sales_data_complete.csv', index=False)
-print("\n✅ Data saved to 'akij_sales_data_complete.csv'")
+class SalesDataStore:
+    """
+    Columnar storage for the transaction frame
+    - Parquet dataset partitioned by calendar month (date_month=YYYY-MM/)
+    - Dimension columns stored dictionary-encoded (pandas categoricals)
+    - Reads support column projection and date-range partition pruning
+    - Written together with the CSV feed and the Arrow snapshot; the snapshot and the
+      store both record the feed watermark (path, byte offset, rows, head digest), so a
+      reader knows which file to follow and only parses rows appended after it
+    """
+
+    CATEGORICAL_COLUMNS = ['product', 'business_division', 'region', 'customer_segment', 'sales_channel']
+    PARTITION_COLUMN = 'date_month'
+    FEED_METADATA_FILE = '_feed.json'  # '_' prefix: skipped by Parquet dataset discovery
+
+    def __init__(self, root: str = 'akij_sales_data', snapshot_path: str = 'akij_sales_data.arrow',
+                 feed_path: str = 'akij_sales_data_complete.csv'):
+        self.root = root
+        self.snapshot_path = snapshot_path
+        self.feed_path = feed_path
+
+    def write(self, data: pd.DataFrame) -> str:
+        """Replace the CSV feed, the Arrow snapshot and the store contents with the given frame"""
+        self.write_feed(data)
+        feed = self.feed_metadata(len(data))
+
+        frame = data.assign(**{
+            col: data[col].astype('category') for col in self.CATEGORICAL_COLUMNS
+        })
+        frame['date'] = pd.to_datetime(frame['date'])
+        self.write_snapshot(frame, feed)
+
+        frame[self.PARTITION_COLUMN] = frame['date'].dt.strftime('%Y-%m')
+        tmp_root = f"{self.root}.tmp"
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        frame.to_parquet(tmp_root, partition_cols=[self.PARTITION_COLUMN], index=False)
+        with open(os.path.join(tmp_root, self.FEED_METADATA_FILE), 'w') as f:
+            json.dump(feed, f)
+        self._swap_in(tmp_root)
+        return self.root
+
+    def write_feed(self, data: pd.DataFrame) -> str:
+        """Export the CSV feed (temp file + rename, so a reader following it sees a new file, not a truncated one)"""
+        tmp_path = f"{self.feed_path}.tmp"
+        SalesSchema.export(data).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.feed_path)
+        return self.feed_path
+
+    def _swap_in(self, tmp_root: str):
+        """
+        Replace the store with a fully written directory by renaming, never by rewriting
+        in place, so readers see the old or the new store and never a partial one. A
+        directory cannot be renamed over a non-empty one, so the old store is moved aside
+        first; the path is missing only between those two renames.
+        """
+        old_root = f"{self.root}.old"
+        shutil.rmtree(old_root, ignore_errors=True)
+        if os.path.exists(self.root):
+            os.replace(self.root, old_root)
+        os.replace(tmp_root, self.root)
+        shutil.rmtree(old_root, ignore_errors=True)
+
+    def write_snapshot(self, frame: pd.DataFrame, feed: Dict[str, Any] = None) -> str:
+        """
+        Write an uncompressed Arrow IPC file that readers can memory-map (zero-copy).
+        Written to a temp file and renamed, so readers never map a half-written file.
+        The feed watermark, if given, is stored in the schema metadata as akij.<key>.
+        """
+        table = pa.Table.from_pandas(frame.reset_index(drop=True), preserve_index=False)
+        if feed is not None:
+            table = table.replace_schema_metadata({
+                **table.schema.metadata,
+                **{f'akij.{key}'.encode(): str(value).encode() for key, value in feed.items()},
+            })
+        tmp_path = f"{self.snapshot_path}.tmp"
+        pa_feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, self.snapshot_path)
+        return self.snapshot_path
+
+    def feed_metadata(self, rows: int, digest_bytes: int = 64 * 1024) -> Dict[str, Any]:
+        """Watermark of the CSV feed: its path, byte offset and row count, plus a digest of its
+        head so a reader can tell a later append (keep the watermark) from a rewrite (reload)"""
+        with open(self.feed_path, 'rb') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.seek(0)
+            head = f.read(min(offset, digest_bytes))
+        return {
+            'feed_path': self.feed_path,
+            'feed_offset': offset,
+            'feed_rows': rows,
+            'feed_digest_bytes': len(head),
+            'feed_digest': hashlib.sha256(head).hexdigest(),
+        }
+
+    def read(self, columns: List[str] = None, start: str = None, end: str = None) -> pd.DataFrame:
+        """Load the store, optionally only some columns and/or a date range (both days inclusive)"""
+        filters = []
+        if start is not None:
+            start = pd.Timestamp(start)
+            filters += [(self.PARTITION_COLUMN, '>=', start.strftime('%Y-%m')), ('date', '>=', start)]
+        if end is not None:
+            end = pd.Timestamp(end).normalize()
+            # Timestamps carry a time of day: everything before the next midnight is on `end`
+            filters += [(self.PARTITION_COLUMN, '<=', end.strftime('%Y-%m')),
+                        ('date', '<', end + pd.Timedelta(days=1))]
+
+        df = pd.read_parquet(self.root, columns=columns, filters=filters or None)
+        return df.drop(columns=[self.PARTITION_COLUMN], errors='ignore')
+
+
+# In[ ]:
+
+
+# Save to CSV (interchange) and to the columnar store (used by the dashboard)
+sales_store = SalesDataStore()
+sales_store.write(sales_data)
+print(f"\n✅ Data saved to '{sales_store.feed_path}'")
+print(f"✅ Data saved to columnar store '{sales_store.root}/' (Parquet, partitioned by month)")
+print(f"✅ Memory-mappable snapshot saved to '{sales_store.snapshot_path}' (Arrow IPC)")
+
+# Date-range reads include every transaction on the end day
+last_week = (sales_data['date'].max() - pd.Timedelta(days=6)).normalize(), sales_data['date'].max().normalize()
+in_range = sales_data['date'].between(last_week[0], last_week[1] + pd.Timedelta(days=1), inclusive='left')
+range_read = sales_store.read(columns=['date', 'revenue'], start=last_week[0], end=last_week[1])
+range_matches = len(range_read) == in_range.sum() and np.isclose(range_read['revenue'].sum(), sales_data.loc[in_range, 'revenue'].sum())
+print(f"✅ Store read {last_week[0]:%Y-%m-%d}..{last_week[1]:%Y-%m-%d} returns all {in_range.sum():,} rows, end day included: {range_matches}")
+
+
+# =============================================================================
+# SECTION 2B: SHARED SALES CUBE (Pre-aggregated for all agents)
+# =============================================================================
+
+# In[ ]:
+
+
+class SalesCube:
+    """
+    Pre-aggregated sales cube shared by every agent
+    - Built in one grouped pass at division × product × region × segment × channel × day grain
+    - Agents roll the cube up to the dimensions they need instead of re-scanning raw rows
+    - Standard roll-ups are materialized and kept current incrementally: new transaction
+      batches fold in as mergeable partial sums/counts (means derive from margin_sum / count),
+      so reading them costs O(groups), not O(rows)
+    """
+
+    DIMENSIONS = ['business_division', 'product', 'region', 'customer_segment', 'sales_channel', 'date']
+    MEASURES = ['revenue', 'profit', 'cost', 'quantity', 'margin_sum', 'count']
+    MATERIALIZED = ['business_division', 'product', 'region', 'customer_segment', 'sales_channel',
+                    'month', 'quarter']
+
+    def __init__(self, cells: pd.DataFrame):
+        self._cells = [cells]
+        self._rollups = {}
+        self._first_day = cells['date'].min()
+        self._last_day = cells['date'].max()
+        self._materialized = {(dim,): self._aggregate(cells, [dim]) for dim in self.MATERIALIZED}
+        self._materialized[()] = cells[self.MEASURES].sum()
+
+    @classmethod
+    def build(cls, data: pd.DataFrame) -> 'SalesCube':
+        """Aggregate raw transactions into cube cells with a single groupby"""
+        return cls(cls._build_cells(data))
+
+    @classmethod
+    def _build_cells(cls, data: pd.DataFrame) -> pd.DataFrame:
+        keys = [data[dim] for dim in cls.DIMENSIONS[:-1]]
+        keys.append(pd.to_datetime(data['date']).dt.normalize())
+
+        # Widen compact-schema columns so sums cannot overflow int16 or lose float32 precision
+        measures = pd.DataFrame({
+            'revenue': data['revenue'],
+            'profit': data['profit'],
+            'cost': data['cost'],
+            'quantity': data['quantity'].astype('int64'),
+            'margin_sum': data['profit_margin'].astype('float64')
+        })
+        grouped = measures.groupby(keys, observed=True, sort=False)
+        cells = grouped.sum().assign(count=grouped.size()).reset_index()
+
+        # Calendar attributes are derived from the (much smaller) cell table
+        cells['month'] = cells['date'].dt.month
+        cells['quarter'] = cells['date'].dt.quarter
+        return cells
+
+    @classmethod
+    def _aggregate(cls, cells: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+        grouped = cells.groupby(by, observed=True)[cls.MEASURES].sum()
+        return cls._with_means(grouped)
+
+    @staticmethod
+    def _with_means(grouped: pd.DataFrame) -> pd.DataFrame:
+        grouped['avg_revenue'] = grouped['revenue'] / grouped['count']
+        grouped['avg_margin'] = grouped['margin_sum'] / grouped['count']
+        return grouped
+
+    @property
+    def cells(self) -> pd.DataFrame:
+        """Cube cells; batches folded in since the last access are compacted here, lazily"""
+        if len(self._cells) > 1:
+            merged = pd.concat(self._cells, ignore_index=True)
+            keys = self.DIMENSIONS + ['month', 'quarter']
+            self._cells = [merged.groupby(keys, observed=True, sort=False)[self.MEASURES].sum().reset_index()]
+        return self._cells[0]
+
+    def fold(self, batch: pd.DataFrame) -> 'SalesCube':
+        """Fold a batch of new transactions into the cube (O(batch rows) + O(groups))"""
+        delta = self._build_cells(batch)
+        self._cells.append(delta)
+        self._rollups = {}  # ad-hoc roll-ups are recomputed from cells on demand
+
+        for key, current in self._materialized.items():
+            if key == ():
+                self._materialized[key] = current.add(delta[self.MEASURES].sum(), fill_value=0)
+                continue
+            partial = delta.groupby(list(key), observed=True)[self.MEASURES].sum()
+            merged = current[self.MEASURES].add(partial, fill_value=0)
+            merged = merged.astype({'quantity': 'int64', 'count': 'int64'})
+            self._materialized[key] = self._with_means(merged)
+
+        self._first_day = min(self._first_day, delta['date'].min())
+        self._last_day = max(self._last_day, delta['date'].max())
+        return self
+
+    def rollup(self, by) -> pd.DataFrame:
+        """Sum cube cells up to the given dimension(s), adding mean revenue and margin"""
+        key = (by,) if isinstance(by, str) else tuple(by)
+        if key in self._materialized:
+            return self._materialized[key]
+        if key not in self._rollups:
+            self._rollups[key] = self._aggregate(self.cells, list(key))
+        return self._rollups[key]
+
+    def totals(self) -> pd.Series:
+        """Grand totals across the whole cube"""
+        return self._materialized[()]
+
+    def daily(self, by=None, measure: str = 'revenue'):
+        """
+        Calendar-complete daily series (zero on days without sales), built from the cells
+        in one grouped pass and cached until the next fold; with `by` (a dimension or list
+        of dimensions), one column per value combination
+        """
+        dims = [] if by is None else [by] if isinstance(by, str) else list(by)
+        key = ('daily', tuple(dims), measure)
+        if key not in self._rollups:
+            cells = self.cells
+            if not dims:
+                series = cells.groupby('date')[measure].sum()
+            else:
+                series = (cells.groupby(['date'] + dims, observed=True)[measure].sum()
+                          .unstack(dims, fill_value=0))
+            calendar = pd.date_range(self._first_day, self._last_day, freq='D', name='date')
+            self._rollups[key] = series.reindex(calendar, fill_value=0)
+        return self._rollups[key]
+
+    def date_range(self) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """First and last trading day covered by the cube"""
+        return self._first_day, self._last_day
+
+
+# In[ ]:
+
+
+# Build the cube once; every agent below reads from it
+sales_cube = SalesCube.build(sales_data)
+print(f"\n🧊 Sales cube built: {len(sales_cube.cells):,} cells from {len(sales_data):,} transactions")
 
 
 # =============================================================================
@@ -408,33 +1016,48 @@ class DescriptiveAgent:
     - Provides comprehensive data overview
     """
 
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, cube: SalesCube = None):
         self.data = data
-        self.data['date'] = pd.to_datetime(self.data['date'])
+        if not pd.api.types.is_datetime64_any_dtype(self.data['date']):
+            self.data['date'] = pd.to_datetime(self.data['date'])
+        self.cube = cube if cube is not None else SalesCube.build(self.data)
+
+    def ingest(self, batch: pd.DataFrame) -> None:
+        """
+        Fold a batch of new transactions into the agent's aggregates (no full recompute)
+        and append it to the agent's rows, so data and cube keep describing the same sales
+        """
+        if not pd.api.types.is_datetime64_any_dtype(batch['date']):
+            batch = batch.assign(date=pd.to_datetime(batch['date']))
+        self.cube.fold(batch)
+        self.data = pd.concat([self.data, batch], ignore_index=True)
 
     def analyze(self) -> Dict[str, Any]:
-        """Perform comprehensive descriptive analysis"""
+        """Perform comprehensive descriptive analysis (reads materialized roll-ups: O(groups))"""
 
         # Overall metrics
-        total_revenue = float(self.data['revenue'].sum())
-        total_profit = float(self.data['profit'].sum())
-        total_transactions = len(self.data)
-        avg_transaction_value = float(self.data['revenue'].mean())
-        avg_profit_margin = float(self.data['profit_margin'].mean())
-        total_quantity = int(self.data['quantity'].sum())
+        totals = self.cube.totals()
+        total_revenue = float(totals['revenue'])
+        total_profit = float(totals['profit'])
+        total_transactions = int(totals['count'])
+        avg_transaction_value = total_revenue / total_transactions
+        avg_profit_margin = float(totals['margin_sum'] / totals['count'])
+        total_quantity = int(totals['quantity'])
 
         # Time-based analysis
+        first_day, last_day = self.cube.date_range()
         date_range = {
-            "start": str(self.data['date'].min().date()),
-            "end": str(self.data['date'].max().date()),
-            "days": (self.data['date'].max() - self.data['date'].min()).days,
+            "start": str(first_day.date()),
+            "end": str(last_day.date()),
+            "days": (last_day - first_day).days,
             "report_date": datetime.now().strftime('%B %d, %Y')
         }
 
         # Business Division analysis
-        division_revenue = self.data.groupby('business_division')['revenue'].sum().sort_values(ascending=False)
-        division_profit = self.data.groupby('business_division')['profit'].sum().sort_values(ascending=False)
-        division_margin = self.data.groupby('business_division')['profit_margin'].mean().sort_values(ascending=False)
+        divisions = self.cube.rollup('business_division')
+        division_revenue = divisions['revenue'].sort_values(ascending=False)
+        division_profit = divisions['profit']
+        division_margin = divisions['avg_margin']
 
         top_division = division_revenue.idxmax()
         division_breakdown = {
@@ -447,13 +1070,14 @@ class DescriptiveAgent:
         }
 
         # Product analysis (Top 15)
-        product_revenue = self.data.groupby('product')['revenue'].sum().sort_values(ascending=False).head(15)
+        product_revenue = self.cube.rollup('product')['revenue'].sort_values(ascending=False).head(15)
         top_product = product_revenue.idxmax()
         product_breakdown = product_revenue.to_dict()
 
         # Regional analysis
-        region_revenue = self.data.groupby('region')['revenue'].sum().sort_values(ascending=False)
-        region_transactions = self.data.groupby('region')['transaction_id'].count()
+        regions = self.cube.rollup('region')
+        region_revenue = regions['revenue'].sort_values(ascending=False)
+        region_transactions = regions['count']
         top_region = region_revenue.idxmax()
         region_breakdown = {
             reg: {
@@ -464,13 +1088,14 @@ class DescriptiveAgent:
         }
 
         # Segment analysis
-        segment_revenue = self.data.groupby('customer_segment')['revenue'].sum().sort_values(ascending=False)
+        segment_revenue = self.cube.rollup('customer_segment')['revenue'].sort_values(ascending=False)
         top_segment = segment_revenue.idxmax()
         segment_breakdown = segment_revenue.to_dict()
 
         # Channel analysis
-        channel_revenue = self.data.groupby('sales_channel')['revenue'].sum().sort_values(ascending=False)
-        channel_margin = self.data.groupby('sales_channel')['profit_margin'].mean()
+        channels = self.cube.rollup('sales_channel')
+        channel_revenue = channels['revenue'].sort_values(ascending=False)
+        channel_margin = channels['avg_margin']
         top_channel = channel_revenue.idxmax()
         channel_breakdown = {
             chan: {
@@ -481,12 +1106,14 @@ class DescriptiveAgent:
         }
 
         # Monthly trends
-        monthly_revenue = self.data.groupby('month')['revenue'].sum().to_dict()
-        monthly_volume = self.data.groupby('month')['transaction_id'].count().to_dict()
+        months = self.cube.rollup('month')
+        monthly_revenue = months['revenue'].to_dict()
+        monthly_volume = months['count'].to_dict()
 
         # Quarterly performance
-        quarterly_revenue = self.data.groupby('quarter')['revenue'].sum().to_dict()
-        quarterly_profit = self.data.groupby('quarter')['profit'].sum().to_dict()
+        quarters = self.cube.rollup('quarter')
+        quarterly_revenue = quarters['revenue'].to_dict()
+        quarterly_profit = quarters['profit'].to_dict()
 
         analysis = {
             "agent_name": "Descriptive Analytics Agent - Akij Resource",
@@ -618,11 +1245,29 @@ Best Channel:         {analysis['top_performers']['channel']}
 
 
 # Initialize and run Descriptive Agent
-descriptive_agent = DescriptiveAgent(sales_data)
+descriptive_agent = DescriptiveAgent(sales_data, sales_cube)
 descriptive_analysis = descriptive_agent.analyze()
 print(descriptive_agent.generate_summary())
 
 
+# In[ ]:
+
+
+# Incremental maintenance: history cube + last 30 days folded in as a batch == full rebuild
+batch_start = sales_data['date'].max() - pd.Timedelta(days=30)
+history, latest_batch = sales_data[sales_data['date'] <= batch_start], sales_data[sales_data['date'] > batch_start]
+
+incremental_agent = DescriptiveAgent(history.copy(), SalesCube.build(history))
+incremental_agent.ingest(latest_batch)
+incremental_analysis = incremental_agent.analyze()
+
+matches = len(incremental_agent.data) == len(sales_data) and all(
+    incremental_analysis[section] == descriptive_analysis[section]
+    for section in ['overall_metrics', 'top_performers', 'temporal_trends']
+)
+print(f"🔁 Incremental fold of {len(latest_batch):,} new transactions matches full rebuild: {matches}")
+
+
 # In[18]:
 
 
@@ -634,7 +1279,7 @@ print(f"   • {len(sales_data['product'].unique())} unique Akij products analyz
 print(f"   • {len(sales_data['business_division'].unique())} business divisions")
 print(f"   • Data period: {sales_data['date'].min().date()} to {sales_data['date'].max().date()}")
 print(f"   • Total Revenue: ৳{sales_data['revenue'].sum():,.2f}")
-print(f"   • Average Margin: {sales_data['profit_margin'].mean():.2f}%")
+print(f"   • Average Margin: {sales_data['profit_margin'].astype('float64').mean():.2f}%")
 print(f"   • Most recent transaction: {sales_data['date'].max().date()}")
 
 
@@ -658,14 +1303,16 @@ class DiagnosticAgent:
     Diagnostic Agent performs root cause analysis to answer: "Why did it happen?"
     """
 
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, cube: SalesCube = None):
         self.data = data
-        self.data['date'] = pd.to_datetime(self.data['date'])
+        if not pd.api.types.is_datetime64_any_dtype(self.data['date']):
+            self.data['date'] = pd.to_datetime(self.data['date'])
+        self.cube = cube if cube is not None else SalesCube.build(self.data)
 
     def analyze(self) -> Dict[str, Any]:
         """Perform comprehensive diagnostic analysis"""
 
-        # Correlation analysis
+        # Correlation analysis (row-level by nature, so it reads the raw frame)
         numeric_cols = ['revenue', 'quantity', 'unit_price', 'cost', 'profit', 'profit_margin']
         corr_matrix = self.data[numeric_cols].corr()
 
@@ -676,32 +1323,31 @@ class DiagnosticAgent:
         }
 
         # Identify underperforming divisions
-        overall_margin = self.data['profit_margin'].mean()
-        division_margins = self.data.groupby('business_division')['profit_margin'].mean()
+        totals = self.cube.totals()
+        overall_margin = float(totals['margin_sum'] / totals['count'])
+        division_margins = self.cube.rollup('business_division')['avg_margin']
         underperformers = division_margins[division_margins < overall_margin].to_dict()
 
         # Channel efficiency analysis
-        channel_efficiency = self.data.groupby('sales_channel').agg({
-            'revenue': 'sum',
-            'profit': 'sum',
-            'profit_margin': 'mean',
-            'transaction_id': 'count'
+        channels = self.cube.rollup('sales_channel')
+        channel_efficiency = pd.DataFrame({
+            'total_revenue': channels['revenue'],
+            'total_profit': channels['profit'],
+            'avg_margin': channels['avg_margin'],
+            'transaction_count': channels['count']
         }).round(2)
 
-        channel_efficiency.columns = ['total_revenue', 'total_profit', 'avg_margin', 'transaction_count']
         channel_efficiency['revenue_per_transaction'] = (
             channel_efficiency['total_revenue'] / channel_efficiency['transaction_count']
         ).round(2)
         channel_efficiency_dict = channel_efficiency.to_dict('index')
 
         # Regional disparity analysis
-        regional_disparity_score = float(
-            self.data.groupby('region')['revenue'].sum().std() / 
-            self.data.groupby('region')['revenue'].sum().mean()
-        )
+        region_revenue = self.cube.rollup('region')['revenue']
+        regional_disparity_score = float(region_revenue.std() / region_revenue.mean())
 
         # Seasonal pattern detection
-        monthly_avg = self.data.groupby('month')['revenue'].mean()
+        monthly_avg = self.cube.rollup('month')['avg_revenue']
         peak_month = int(monthly_avg.idxmax())
         low_month = int(monthly_avg.idxmin())
         seasonality_strength = float((monthly_avg.max() - monthly_avg.min()) / monthly_avg.mean())
@@ -788,7 +1434,7 @@ class DiagnosticAgent:
 # In[21]:
 
 
-diagnostic_agent = DiagnosticAgent(sales_data)
+diagnostic_agent = DiagnosticAgent(sales_data, sales_cube)
 diagnostic_analysis = diagnostic_agent.analyze()
 print(diagnostic_agent.generate_summary())
 
@@ -805,55 +1451,370 @@ print("AGENT 3: PREDICTIVE ANALYTICS - What is likely to happen?")
 print("="*80)
 
 
+# In[ ]:
+
+
+class HoltWintersForecaster:
+    """
+    Additive Holt-Winters (damped trend, weekly season) plus a yearly Fourier term,
+    fitted to many daily series at once
+    - Series are the rows of a (series × days) matrix; each step of the smoothing
+      recursion updates every series under every candidate parameter set as one
+      array operation, so there is no Python loop per series
+    - Smoothing parameters are chosen per series from a small grid by in-sample
+      one-step-ahead squared error
+    - Yearly seasonality is removed first with one least-squares solve shared by all
+      series (only when the history covers at least a year)
+    """
+
+    ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5)  # level
+    BETAS = (0.0, 0.01, 0.05)            # trend
+    GAMMAS = (0.05, 0.15, 0.3)           # weekly season
+    YEAR_DAYS = 365.25
+
+    def __init__(self, season_length: int = 7, yearly_harmonics: int = 3, damping: float = 0.98):
+        self.season_length = season_length
+        self.yearly_harmonics = yearly_harmonics
+        self.damping = damping
+
+    def _fourier(self, t: np.ndarray) -> np.ndarray:
+        angle = 2 * np.pi * np.outer(t, np.arange(1, self.yearly_harmonics + 1)) / self.YEAR_DAYS
+        return np.hstack([np.cos(angle), np.sin(angle)])
+
+    def fit(self, series: np.ndarray) -> 'HoltWintersForecaster':
+        """Fit every row of a (series × days) matrix of consecutive daily values"""
+        y = np.atleast_2d(np.asarray(series, dtype='float64'))
+        n_series, n_days = y.shape
+        m = self.season_length
+        if n_days < 2 * m:
+            raise ValueError(f"need at least {2 * m} days of history, got {n_days}")
+
+        # Yearly component: intercept + slope + Fourier terms, one solve for all series
+        self.yearly_coef_ = None
+        if self.yearly_harmonics and n_days >= self.YEAR_DAYS:
+            t = np.arange(n_days)
+            fourier = self._fourier(t)
+            design = np.column_stack([np.ones(n_days), t / n_days, fourier])
+            coef = np.linalg.lstsq(design, y.T, rcond=None)[0]
+            self.yearly_coef_ = coef[2:]
+            y = y - (fourier @ self.yearly_coef_).T
+
+        # Candidate parameters on a leading axis: state arrays are (candidates × series)
+        alpha, beta, gamma = (grid.reshape(-1, 1) for grid in
+                              np.meshgrid(self.ALPHAS, self.BETAS, self.GAMMAS, indexing='ij'))
+        n_candidates = len(alpha)
+        first_week = y[:, :m].mean(axis=1)
+        level = np.tile(first_week, (n_candidates, 1))
+        trend = np.tile((y[:, m:2 * m].mean(axis=1) - first_week) / m, (n_candidates, 1))
+        season = np.tile(y[:, :m] - first_week[:, None], (n_candidates, 1, 1))
+        sse = np.zeros((n_candidates, n_series))
+        phi = self.damping
+
+        for t in range(n_days):
+            obs = y[:, t]
+            s = season[:, :, t % m]
+            damped = level + phi * trend
+            if t >= m:  # the first season only warms the state up
+                sse += (obs - damped - s) ** 2
+            new_level = alpha * (obs - s) + (1 - alpha) * damped
+            trend = beta * (new_level - level) + (1 - beta) * phi * trend
+            season[:, :, t % m] = gamma * (obs - new_level) + (1 - gamma) * s
+            level = new_level
+
+        best, rows = sse.argmin(axis=0), np.arange(n_series)
+        self.level_ = level[best, rows]
+        self.trend_ = trend[best, rows]
+        self.season_ = season[best, rows]
+        self.params_ = np.column_stack([alpha[best, 0], beta[best, 0], gamma[best, 0]])
+        self.n_days_ = n_days
+        return self
+
+    def forecast(self, horizon: int) -> np.ndarray:
+        """(series × horizon) forecasts for the days after the fitted history, floored at zero"""
+        steps = np.arange(1, horizon + 1)
+        t = self.n_days_ + steps - 1
+        forecast = (self.level_[:, None]
+                    + self.trend_[:, None] * np.cumsum(self.damping ** steps)
+                    + self.season_[:, t % self.season_length])
+        if self.yearly_coef_ is not None:
+            forecast += (self._fourier(t) @ self.yearly_coef_).T
+        return np.maximum(forecast, 0)
+
+
+def _forecast_shared_rows(task) -> Tuple[int, np.ndarray]:
+    """Worker: attach to the shared series matrix and forecast one block of its rows"""
+    shm_name, shape, lo, hi, horizon = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # The block is a view into shared memory: nothing large is pickled either way
+        rows = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)[lo:hi]
+        forecast = HoltWintersForecaster().fit(rows).forecast(horizon)
+        del rows  # release the buffer export before closing
+        return lo, forecast
+    finally:
+        shm.close()
+
+
+def forecast_shared(series: np.ndarray, horizon: int, max_workers: int = None) -> np.ndarray:
+    """
+    Holt-Winters forecasts for every row of a (series × days) matrix, fitted in blocks
+    across a process pool. The matrix is copied once into shared memory; workers get
+    its name and their row range, and send back only their (rows × horizon) forecasts.
+    Where fork is unavailable the blocks are fitted on threads over the matrix itself.
+    """
+    series = np.asarray(series, dtype=np.float64)
+    workers = max_workers or os.cpu_count() or 1
+    bounds = np.linspace(0, len(series), min(len(series), 2 * workers) + 1).astype(int)
+    forecasts = np.empty((len(series), horizon))
+
+    if 'fork' not in mp.get_all_start_methods():
+        def fit_rows(lo: int, hi: int) -> Tuple[int, np.ndarray]:
+            return lo, HoltWintersForecaster().fit(series[lo:hi]).forecast(horizon)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for lo, block in pool.map(fit_rows, bounds[:-1], bounds[1:]):
+                forecasts[lo:lo + len(block)] = block
+        return forecasts
+
+    shm = shared_memory.SharedMemory(create=True, size=max(series.nbytes, 1))
+    try:
+        shared = np.ndarray(series.shape, dtype=np.float64, buffer=shm.buf)
+        shared[:] = series
+        del shared
+        tasks = [(shm.name, series.shape, lo, hi, horizon) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        with process_pool(workers) as pool:
+            for lo, block in pool.map(_forecast_shared_rows, tasks):
+                forecasts[lo:lo + len(block)] = block
+    finally:
+        shm.close()
+        shm.unlink()
+    return forecasts
+
+
+class HierarchicalReconciler:
+    """
+    Coherent forecasts across an aggregation hierarchy (product → division → total by default)
+    - The summing matrix S maps bottom series to every node: one row for the total, one block
+      of rows per level, then the bottom series. Each block has a single 1 per bottom column,
+      so S holds (levels + 2) × bottom non-zeros and adding a level (region, channel) grows
+      it linearly. A level is a column or a tuple of columns (e.g. division × region)
+    - Base forecasts for every node are reconciled with structurally weighted least squares:
+      ỹ = S·(Sᵀ Λ S)⁻¹ Sᵀ Λ·ŷ with Λ = 1 / (bottom series under each node). Sᵀ Λ S is
+      factorized once per hierarchy (sparse LU); each batch is one solve against Sᵀ Λ ŷ,
+      so the dense (bottom × nodes) projection is never formed
+    - method='bottom_up' ignores the upper-level forecasts: ỹ = S·ŷ_bottom
+    - Uses scipy.sparse when installed, dense NumPy otherwise
+    """
+
+    def __init__(self, bottom: pd.DataFrame, key, levels: List[str], method: str = 'wls'):
+        if method not in ('wls', 'bottom_up'):
+            raise ValueError(f"method must be 'wls' or 'bottom_up', got {method!r}")
+        self.key = [key] if isinstance(key, str) else list(key)
+        self.levels = list(levels)
+        self.method = method
+        bottom = bottom.drop_duplicates(self.key).reset_index(drop=True)
+        self.bottom_keys = (pd.Index(bottom[self.key[0]]) if len(self.key) == 1
+                            else pd.MultiIndex.from_frame(bottom[self.key]))
+
+        # One block of rows per level: row = block offset + the bottom column's group code
+        n_bottom = len(bottom)
+        blocks = [np.zeros(n_bottom, dtype=np.int64)]
+        nodes = [('total', 'Total')]
+        for level in self.levels:
+            columns = [level] if isinstance(level, str) else list(level)
+            values = bottom[level] if len(columns) == 1 else pd.MultiIndex.from_frame(bottom[columns])
+            codes, groups = pd.factorize(values, sort=True)
+            blocks.append(len(nodes) + codes)
+            nodes += [(" × ".join(columns), " × ".join(map(str, group)) if isinstance(group, tuple) else group)
+                      for group in groups]
+        blocks.append(len(nodes) + np.arange(n_bottom))
+        bottom_level = " × ".join(self.key)
+        nodes += [(bottom_level, " × ".join(map(str, k)) if isinstance(k, tuple) else k)
+                  for k in self.bottom_keys]
+        self.nodes = pd.MultiIndex.from_tuples(nodes, names=['level', 'node'])
+        self.bottom_rows = slice(len(nodes) - n_bottom, len(nodes))
+
+        rows = np.concatenate(blocks)
+        cols = np.tile(np.arange(n_bottom), len(blocks))
+        shape = (len(nodes), n_bottom)
+        if sparse is not None:
+            self.summing = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+        else:
+            self.summing = np.zeros(shape)
+            self.summing[rows, cols] = 1.0
+
+        self._weighted = self._solve = None
+        if method == 'wls':
+            weights = 1.0 / np.asarray(self.summing.sum(axis=1)).ravel()  # Λ
+            if sparse is not None:
+                self._weighted = self.summing.T.multiply(weights).tocsr()   # Sᵀ Λ
+                self._solve = splu((self._weighted @ self.summing).tocsc()).solve
+            else:
+                self._weighted = self.summing.T * weights
+                normal = self._weighted @ self.summing
+                self._solve = lambda rhs: np.linalg.solve(normal, rhs)
+
+    @classmethod
+    def from_catalog(cls, regions: List[str] = None, method: str = 'wls') -> 'HierarchicalReconciler':
+        """
+        Product → division → total over SalesDataGenerator's product catalogue; with regions,
+        the bottom is product × region, and region, division × region and product totals
+        become levels too
+        """
+        bottom = pd.DataFrame([(division, product)
+                               for division, products in SalesDataGenerator.AKIJ_PRODUCTS.items()
+                               for product in products],
+                              columns=['business_division', 'product'])
+        if not regions:
+            return cls(bottom, 'product', ['business_division'], method)
+        bottom = bottom.merge(pd.DataFrame({'region': regions}), how='cross')
+        return cls(bottom, ['product', 'region'],
+                   ['business_division', 'region', ('business_division', 'region'), 'product'], method)
+
+    def aggregate(self, bottom: np.ndarray) -> np.ndarray:
+        """(bottom × days) values → (nodes × days) values at every level"""
+        return np.asarray(self.summing @ bottom)
+
+    def reconcile(self, base: np.ndarray) -> np.ndarray:
+        """(nodes × horizon) base forecasts → coherent (nodes × horizon) forecasts"""
+        if self.method == 'bottom_up':
+            bottom = base[self.bottom_rows]
+        else:
+            bottom = self._solve(np.asarray(self._weighted @ base))
+        return self.aggregate(np.maximum(bottom, 0))
+
+
 # In[23]:
 
 
 class PredictiveAgent:
     """
     Predictive Agent forecasts future trends
+    - Growth compares the latest two GROWTH_WINDOW_DAYS calendar windows of daily revenue
+    - Windows are read from the cube's daily series, so the cost is O(days), not O(rows)
+    - Revenue forecasts come from Holt-Winters fitted to every node of the product × region
+      hierarchy (total, divisions, regions, division × region, products), reconciled so
+      that every level adds up to the levels above it
+    - forecast_batch() covers many more series (products, product × region) by fanning
+      the fit out across processes over a shared-memory copy of the series matrix
     """
 
-    def __init__(self, data: pd.DataFrame):
+    GROWTH_WINDOW_DAYS = 30
+
+    def __init__(self, data: pd.DataFrame, cube: SalesCube = None,
+                 hierarchy: HierarchicalReconciler = None):
         self.data = data
-        self.data['date'] = pd.to_datetime(self.data['date'])
+        if not pd.api.types.is_datetime64_any_dtype(self.data['date']):
+            self.data['date'] = pd.to_datetime(self.data['date'])
+        self.cube = cube if cube is not None else SalesCube.build(self.data)
+        if hierarchy is None:
+            hierarchy = HierarchicalReconciler.from_catalog(list(self.cube.rollup('region').index))
+        self.hierarchy = hierarchy
+
+    def forecast_hierarchy(self, forecast_days: int) -> pd.DataFrame:
+        """Reconciled daily revenue forecasts, one (level, node) column per hierarchy node"""
+        bottom = self.cube.daily(self.hierarchy.key).reindex(columns=self.hierarchy.bottom_keys, fill_value=0)
+        history = self.hierarchy.aggregate(bottom.to_numpy().T)
+        base = HoltWintersForecaster().fit(history).forecast(forecast_days)
+        index = pd.date_range(bottom.index[-1] + pd.Timedelta(days=1), periods=forecast_days,
+                              freq='D', name='date')
+        return pd.DataFrame(self.hierarchy.reconcile(base).T, index=index, columns=self.hierarchy.nodes)
+
+    def window_growth(self, daily):
+        """
+        Change in mean daily value between the last two GROWTH_WINDOW_DAYS calendar windows;
+        None when the history does not cover two full windows
+        """
+        window = self.GROWTH_WINDOW_DAYS
+        if len(daily) < 2 * window:
+            return None
+        rolling = daily.rolling(f'{window}D').mean()
+        recent = rolling.iloc[-1]
+        previous = rolling.iloc[-1 - window]
+        if isinstance(previous, pd.Series):  # one growth rate per column
+            return ((recent - previous) / previous.where(previous > 0)).fillna(0)
+        return (recent - previous) / previous if previous > 0 else 0
+
+    @staticmethod
+    def trend_label(growth: float) -> str:
+        if growth is None:
+            return "❔ Insufficient history"
+        return "📈 Growing" if growth > 0.05 else "📉 Declining" if growth < -0.05 else "➡️  Stable"
+
+    @staticmethod
+    def growth_pct(growth: float) -> float:
+        """Growth as a rounded percentage (None stays None)"""
+        return None if growth is None else round(float(growth * 100), 2)
+
+    @staticmethod
+    def growth_text(pct: float, digits: int = 1) -> str:
+        return "n/a" if pct is None else f"{pct:+.{digits}f}%"
+
+    def forecast_batch(self, by=('product',), forecast_days: int = 30,
+                       max_workers: int = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Forecasts for every `by` series (products by default, or e.g. ('product', 'region')),
+        fitted across a process pool; same shape as the division_forecasts entries
+        """
+        history = self.cube.daily(list(by))
+        totals = forecast_shared(history.to_numpy().T, forecast_days, max_workers).sum(axis=1)
+        growth = self.window_growth(history)
+
+        forecasts = {}
+        for column, total in zip(history.columns, totals):
+            label = " × ".join(map(str, column)) if isinstance(column, tuple) else column
+            column_growth = None if growth is None else growth[column]
+            forecasts[label] = {
+                "forecast_revenue": round(float(total), 2),
+                "growth_rate": self.growth_pct(column_growth),
+                "trend": self.trend_label(column_growth)
+            }
+        return forecasts
 
     def analyze(self, forecast_days: int = 30) -> Dict[str, Any]:
         """Perform predictive analysis and forecasting"""
 
-        # Calculate growth rate
-        recent_30_days = self.data.tail(300)['revenue'].mean()
-        previous_30_days = self.data.tail(600).head(300)['revenue'].mean()
-        growth_rate = ((recent_30_days - previous_30_days) / previous_30_days) if previous_30_days > 0 else 0
+        # Calculate growth rate: mean daily revenue over the last two calendar windows
+        growth_rate = self.window_growth(self.cube.daily())
 
-        # Forecast
-        last_week_avg = self.data.tail(70)['revenue'].mean()
-        forecast_daily_revenue = last_week_avg * (1 + growth_rate)
-        forecast_total_revenue = forecast_daily_revenue * forecast_days
+        # Forecast: Holt-Winters at every hierarchy level, reconciled to coherent totals
+        node_totals = self.forecast_hierarchy(forecast_days).sum()
+        forecast_by_division = node_totals['business_division']
+        forecast_total_revenue = node_totals[('total', 'Total')]
+        forecast_daily_revenue = forecast_total_revenue / forecast_days
 
-        # Division-wise forecasts
-        division_forecasts = {}
-        for division in self.data['business_division'].unique():
-            div_data = self.data[self.data['business_division'] == division]
-            div_recent = div_data.tail(200)['revenue'].mean()
-            div_previous = div_data.head(200)['revenue'].mean()
+        # Division-wise forecasts: the same windows over one day × division series
+        growth_by_division = self.window_growth(self.cube.daily('business_division'))
 
-            div_growth = ((div_recent - div_previous) / div_previous) if div_previous > 0 else 0
+        # Division × region forecasts, when the hierarchy has that level
+        division_region_forecasts = {
+            node: round(float(total), 2)
+            for node, total in node_totals.get('business_division × region', pd.Series(dtype=float)).items()
+        }
 
+        division_forecasts = {}
+        for division in self.cube.rollup('business_division').index:
+            div_growth = None if growth_by_division is None else growth_by_division[division]
             division_forecasts[division] = {
-                "growth_rate": round(float(div_growth * 100), 2),
-                "trend": "📈 Growing" if div_growth > 0.05 else "📉 Declining" if div_growth < -0.05 else "➡️  Stable"
+                "forecast_revenue": round(float(forecast_by_division.get(division, 0.0)), 2),
+                "growth_rate": self.growth_pct(div_growth),
+                "trend": self.trend_label(div_growth)
             }
 
         analysis = {
             "agent_name": "Predictive Analytics Agent - Akij Resource",
             "timestamp": datetime.now().isoformat(),
             "forecast_period": f"{forecast_days} days",
+            "forecast_model": "Holt-Winters (damped trend, weekly + yearly seasonality), "
+                              f"{self.hierarchy.method}-reconciled",
+            "series_forecast": len(node_totals),
             "overall_forecast": {
                 "predicted_daily_revenue": round(float(forecast_daily_revenue), 2),
                 "predicted_total_revenue": round(float(forecast_total_revenue), 2),
-                "growth_rate_pct": round(float(growth_rate * 100), 2)
+                "growth_rate_pct": self.growth_pct(growth_rate)
             },
-            "division_forecasts": division_forecasts
+            "division_forecasts": division_forecasts,
+            "division_region_forecasts": division_region_forecasts
         }
 
         return analysis
@@ -871,14 +1832,14 @@ class PredictiveAgent:
 🔮 30-DAY FORECAST
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 Predicted Total Revenue: ৳{analysis['overall_forecast']['predicted_total_revenue']:,.2f}
-Growth Rate: {analysis['overall_forecast']['growth_rate_pct']:+.2f}%
+Growth Rate: {self.growth_text(analysis['overall_forecast']['growth_rate_pct'], 2)}
 
 📦 DIVISION FORECASTS
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 """
         for div, forecast in sorted(analysis['division_forecasts'].items(), 
-                                    key=lambda x: x[1]['growth_rate'], reverse=True):
-            summary += f"{div:.<40} {forecast['trend']} ({forecast['growth_rate']:+.1f}%)\n"
+                                    key=lambda x: x[1]['growth_rate'] or 0, reverse=True):
+            summary += f"{div:.<40} ৳{forecast['forecast_revenue']:>14,.0f}  {forecast['trend']} ({self.growth_text(forecast['growth_rate'])})\n"
 
         return summary
 
@@ -886,10 +1847,200 @@ Growth Rate: {analysis['overall_forecast']['growth_rate_pct']:+.2f}%
 # In[24]:
 
 
-predictive_agent = PredictiveAgent(sales_data)
+predictive_agent = PredictiveAgent(sales_data, sales_cube)
 predictive_analysis = predictive_agent.analyze()
 print(predictive_agent.generate_summary())
 
+# Product-level forecasts: every product series, fitted across all cores
+product_forecasts = predictive_agent.forecast_batch(('product',))
+print(f"📦 TOP PRODUCT FORECASTS ({len(product_forecasts)} products, 30 days)")
+for product, forecast in sorted(product_forecasts.items(), key=lambda x: x[1]['forecast_revenue'],
+                                reverse=True)[:5]:
+    print(f"{product:.<40} ৳{forecast['forecast_revenue']:>14,.0f}  {forecast['trend']} "
+          f"({predictive_agent.growth_text(forecast['growth_rate'])})")
+
+
+# =============================================================================
+# SECTION 5B: FORECAST BACKTESTING (How accurate are the forecasts?)
+# =============================================================================
+
+# In[ ]:
+
+
+def _holt_winters_model(fold: Dict[str, np.ndarray], horizon: int) -> np.ndarray:
+    """Holt-Winters as used by PredictiveAgent"""
+    return HoltWintersForecaster().fit(fold['train']).forecast(horizon)
+
+
+def _calendar_growth_model(fold: Dict[str, np.ndarray], horizon: int) -> np.ndarray:
+    """Last 30-day mean daily revenue × (1 + growth over the previous 30 days), held flat"""
+    recent = fold['train'][:, -30:].mean(axis=1)
+    previous = fold['train'][:, -60:-30].mean(axis=1)
+    growth = np.divide(recent - previous, previous, out=np.zeros_like(recent), where=previous > 0)
+    return np.repeat((recent * (1 + growth))[:, None], horizon, axis=1)
+
+
+def _transaction_tail_model(fold: Dict[str, np.ndarray], horizon: int) -> np.ndarray:
+    """The chatbot's 'forecast next N days' rule: last 300 vs previous 300 transactions"""
+    recent, previous = fold['tail_means'][:, 0], fold['tail_means'][:, 1]
+    growth = np.divide(recent - previous, previous, out=np.zeros_like(recent), where=previous > 0)
+    return np.repeat((recent * (1 + growth))[:, None], horizon, axis=1)
+
+
+_BACKTEST_SHARED = None  # backtester inherited by forked fold workers
+
+
+def _run_backtest_fold(origin: int, backtester: 'ForecastBacktester' = None) -> List[Dict[str, Any]]:
+    """Worker: forecast one fold with every model (forked workers use the inherited backtester)"""
+    backtester = backtester or _BACKTEST_SHARED
+    fold = backtester.fold(origin)
+    rows = []
+    for name, model in backtester.models.items():
+        forecast = model(fold, backtester.horizon).sum(axis=1)
+        rows += [{'model': name, 'division': division, 'origin': fold['origin_date'],
+                  'forecast': float(f), 'actual': float(a)}
+                 for division, f, a in zip(backtester.divisions, forecast, fold['actual'])]
+    return rows
+
+
+class ForecastBacktester:
+    """
+    Rolling-origin backtest of the revenue forecasters, scored per division
+    - Origins step back from the end of history every `step` days; each fold trains on the
+      days before its origin and forecasts the next `horizon` days
+    - Fold inputs (training window, actual horizon totals, transaction-tail means) are built
+      once per origin and cached, so re-running or adding models reuses them
+    - Folds run in parallel on a forked process pool (or threads); each runs every model
+    - Errors are on per-division horizon totals: MAPE, sMAPE and bias, in percent
+    """
+
+    MODELS = {
+        'holt_winters': _holt_winters_model,
+        'calendar_growth': _calendar_growth_model,
+        'transaction_tail': _transaction_tail_model,
+    }
+
+    def __init__(self, data: pd.DataFrame, cube: SalesCube, horizon: int = 30, step: int = 30,
+                 min_train_days: int = 180, models: Dict[str, Any] = None,
+                 executor: str = 'process', max_workers: int = None):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"executor must be 'thread' or 'process', got {executor!r}")
+        self.horizon = horizon
+        self.step = step
+        self.min_train_days = min_train_days
+        self.models = dict(models or self.MODELS)
+        self.executor = executor
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+        daily = cube.daily('business_division')
+        self.dates = daily.index
+        self.divisions = list(daily.columns)
+        self.series = np.ascontiguousarray(daily.to_numpy().T, dtype=np.float64)
+
+        # Per-division transaction dates and running revenue, for O(1) tail means at any origin
+        ordered = data.sort_values('date', kind='stable')
+        self._tails = {}
+        for division, rows in ordered.groupby('business_division', observed=True, sort=False):
+            dates = pd.to_datetime(rows['date']).dt.normalize().to_numpy()
+            cumulative = np.concatenate([[0.0], rows['revenue'].to_numpy(dtype=np.float64).cumsum()])
+            self._tails[division] = (dates, cumulative)
+        self._folds = {}
+        self.elapsed = None
+
+    @property
+    def origins(self) -> List[int]:
+        """Fold origins as day positions, oldest first"""
+        last = len(self.dates) - self.horizon
+        return list(range(last, self.min_train_days - 1, -self.step))[::-1]
+
+    def _tail_means(self, division, origin_date) -> Tuple[float, float]:
+        """Mean revenue of the last 300 and the 300 before them, among transactions before origin"""
+        if division not in self._tails:
+            return 0.0, 0.0
+        dates, cumulative = self._tails[division]
+        end = int(np.searchsorted(dates, origin_date.to_datetime64(), side='left'))
+        mean = lambda lo, hi: (cumulative[hi] - cumulative[lo]) / (hi - lo) if hi > lo else 0.0
+        start = max(0, end - 600)
+        return mean(max(0, end - 300), end), mean(start, min(start + 300, end))
+
+    def fold(self, origin: int) -> Dict[str, Any]:
+        """Cached inputs for the fold starting at day position `origin`"""
+        if origin not in self._folds:
+            origin_date = self.dates[origin]
+            self._folds[origin] = {
+                'origin_date': origin_date,
+                'train': self.series[:, :origin],
+                'actual': self.series[:, origin:origin + self.horizon].sum(axis=1),
+                'tail_means': np.array([self._tail_means(d, origin_date) for d in self.divisions]),
+            }
+        return self._folds[origin]
+
+    def run(self) -> pd.DataFrame:
+        """Forecast and actual horizon totals for every model, division and fold"""
+        global _BACKTEST_SHARED
+        start = time.perf_counter()
+        origins = self.origins
+        for origin in origins:  # built in the parent so workers inherit the cache
+            self.fold(origin)
+
+        rows = []
+        if self.executor == 'process' and 'fork' in mp.get_all_start_methods():
+            _BACKTEST_SHARED = self
+            try:
+                with process_pool(self.max_workers) as pool:
+                    for fold_rows in pool.map(_run_backtest_fold, origins):
+                        rows += fold_rows
+            finally:
+                _BACKTEST_SHARED = None
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for fold_rows in pool.map(lambda origin: _run_backtest_fold(origin, self), origins):
+                    rows += fold_rows
+        self.elapsed = time.perf_counter() - start
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def score(results: pd.DataFrame) -> pd.DataFrame:
+        """MAPE, sMAPE and bias (%) per model and division, plus an all-divisions row per model"""
+        def errors(group: pd.DataFrame) -> pd.Series:
+            f, a = group['forecast'], group['actual']
+            scored = a > 0
+            return pd.Series({
+                'folds': int(scored.sum()),
+                'mape': float((abs(f - a)[scored] / a[scored]).mean() * 100),
+                'smape': float((2 * abs(f - a) / (abs(f) + abs(a)).where(lambda x: x > 0)).mean() * 100),
+                'bias': float((f.sum() - a.sum()) / a.sum() * 100) if a.sum() > 0 else 0.0,
+            })
+
+        measures = ['forecast', 'actual']
+        by_division = results.groupby(['model', 'division'], observed=True)[measures].apply(errors)
+        overall = results.groupby('model')[measures].apply(errors)
+        overall.index = pd.MultiIndex.from_product([overall.index, ['All divisions']],
+                                                   names=['model', 'division'])
+        return pd.concat([by_division, overall]).sort_index().round(2)
+
+    def report(self, scores: pd.DataFrame) -> str:
+        """Per-model error table with the all-divisions row first"""
+        folds = len(self.origins)
+        lines = [f"🧪 Rolling-origin backtest: {folds} folds × {self.horizon}-day horizon, "
+                 f"{len(self.models)} models ({self.executor} pool, {self.elapsed:.1f}s)"]
+        for model in scores.index.get_level_values('model').unique():
+            lines.append(f"\n{model}")
+            table = scores.loc[model]
+            for division in ['All divisions'] + [d for d in table.index if d != 'All divisions']:
+                row = table.loc[division]
+                lines.append(f"   {division:.<32} MAPE {row['mape']:6.1f}%  sMAPE {row['smape']:6.1f}%  "
+                             f"bias {row['bias']:+6.1f}%")
+        return "\n".join(lines)
+
+
+# In[ ]:
+
+
+backtester = ForecastBacktester(sales_data, sales_cube)
+backtest_scores = ForecastBacktester.score(backtester.run())
+print(backtester.report(backtest_scores))
+
 
 # =============================================================================
 # SECTION 6: AGENT 4 - PRESCRIPTIVE ANALYTICS (What should be done?)
@@ -984,6 +2135,105 @@ prescriptive_analysis = prescriptive_agent.analyze()
 print(prescriptive_agent.generate_summary())
 
 
+# In[ ]:
+
+
+# Pipeline runner: the three independent agents fan out concurrently, Prescriptive joins
+_PIPELINE_SHARED = None  # (data, cube) inherited by forked workers
+
+
+def _run_pipeline_agent(name: str, data: pd.DataFrame = None, cube: SalesCube = None) -> Tuple[str, Dict, float]:
+    """Worker: run one independent agent and time it (forked workers read the inherited frame)"""
+    if data is None:
+        data, cube = _PIPELINE_SHARED
+    start = time.perf_counter()
+    result = AgentPipeline.INDEPENDENT[name](data, cube).analyze()
+    return name, result, time.perf_counter() - start
+
+
+class AgentPipeline:
+    """
+    Runs the four-agent report with the independent stages in parallel
+    - Descriptive, Diagnostic and Predictive only read the frame and cube, so they fan out
+      to a thread pool (or forked process pool) over one shared, read-only copy
+    - Prescriptive waits for all three; wall time is recorded per agent
+    """
+
+    INDEPENDENT = {
+        'descriptive': DescriptiveAgent,
+        'diagnostic': DiagnosticAgent,
+        'predictive': PredictiveAgent,
+    }
+
+    def __init__(self, data: pd.DataFrame, cube: SalesCube = None,
+                 executor: str = 'thread', max_workers: int = None):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"executor must be 'thread' or 'process', got {executor!r}")
+        self.data = data
+        if not pd.api.types.is_datetime64_any_dtype(self.data['date']):
+            self.data['date'] = pd.to_datetime(self.data['date'])
+        self.cube = cube if cube is not None else SalesCube.build(self.data)
+        self.cube.cells  # compact pending folds now so workers never mutate the shared cube
+        self.executor = executor
+        self.max_workers = max_workers or len(self.INDEPENDENT)
+        self.timings = {}
+
+    def _fan_out(self) -> Dict[str, Dict]:
+        global _PIPELINE_SHARED
+        results = {}
+        if self.executor == 'process' and 'fork' in mp.get_all_start_methods():
+            _PIPELINE_SHARED = (self.data, self.cube)
+            try:
+                with process_pool(self.max_workers) as pool:
+                    futures = [pool.submit(_run_pipeline_agent, name) for name in self.INDEPENDENT]
+                    for future in futures:
+                        name, results[name], self.timings[name] = future.result()
+            finally:
+                _PIPELINE_SHARED = None
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(_run_pipeline_agent, name, self.data, self.cube)
+                           for name in self.INDEPENDENT]
+                for future in futures:
+                    name, results[name], self.timings[name] = future.result()
+        return results
+
+    def run(self) -> Dict[str, Dict]:
+        """Run all four agents; returns their analyses keyed by agent name"""
+        self.timings = {}
+        start = time.perf_counter()
+        results = self._fan_out()
+
+        presc_start = time.perf_counter()
+        results['prescriptive'] = PrescriptiveAgent(
+            results['descriptive'], results['diagnostic'], results['predictive']).analyze()
+        self.timings['prescriptive'] = time.perf_counter() - presc_start
+        self.timings['total'] = time.perf_counter() - start
+        return results
+
+    def timing_report(self) -> str:
+        """Per-agent wall times and the saving over running them back to back"""
+        agents = [name for name in self.timings if name != 'total']
+        sequential = sum(self.timings[name] for name in agents)
+        lines = [f"⏱️ Agent pipeline ({self.executor} pool, {self.max_workers} workers)"]
+        lines += [f"   • {name.title():<13} {self.timings[name] * 1000:8.1f} ms" for name in agents]
+        lines.append(f"   • End-to-end    {self.timings['total'] * 1000:8.1f} ms "
+                     f"(back-to-back: {sequential * 1000:.1f} ms)")
+        return "\n".join(lines)
+
+
+pipeline = AgentPipeline(sales_data, sales_cube)
+pipeline_results = pipeline.run()
+print(pipeline.timing_report())
+
+sequential_results = {'descriptive': descriptive_analysis, 'diagnostic': diagnostic_analysis,
+                      'predictive': predictive_analysis, 'prescriptive': prescriptive_analysis}
+without_timestamp = lambda analysis: {k: v for k, v in analysis.items() if k != 'timestamp'}
+pipeline_matches = all(without_timestamp(pipeline_results[name]) == without_timestamp(sequential_results[name])
+                       for name in sequential_results)
+print(f"   • Matches sequential run: {pipeline_matches}")
+
+
 # =============================================================================
 # SECTION 7: N8N WORKFLOW EXPORT
 # =============================================================================
@@ -1003,12 +2253,14 @@ class N8NWorkflowGenerator:
     """Generate AI payload and auto-create n8n importable workflow"""
 
     def __init__(self, desc_analysis: Dict, diag_analysis: Dict,
-                 pred_analysis: Dict, presc_analysis: Dict, raw_data: pd.DataFrame):
+                 pred_analysis: Dict, presc_analysis: Dict, raw_data: pd.DataFrame,
+                 cube: SalesCube = None):
         self.descriptive = desc_analysis
         self.diagnostic = diag_analysis
         self.predictive = pred_analysis
         self.prescriptive = presc_analysis
         self.raw_data = raw_data
+        self.cube = cube if cube is not None else SalesCube.build(raw_data)
 
     # ---------------------------------------------------------------------
     # STEP 1️⃣ — Generate payload JSON
@@ -1017,7 +2269,10 @@ class N8NWorkflowGenerator:
         """Generate complete n8n-compatible AI payload"""
 
         growth_rate = self.predictive['overall_forecast']['growth_rate_pct']
-        if growth_rate < -5:
+        if growth_rate is None:  # too little history to compare windows
+            priority = "NORMAL"
+            alert_type = "info"
+        elif growth_rate < -5:
             priority = "CRITICAL"
             alert_type = "urgent"
         elif growth_rate < 0:
@@ -1027,6 +2282,9 @@ class N8NWorkflowGenerator:
             priority = "NORMAL"
             alert_type = "info"
 
+        totals = self.cube.totals()
+        first_day, last_day = self.cube.date_range()
+
         payload = {
             "workflow_metadata": {
                 "workflow_name": "akij_sales_intelligence_multi_agent",
@@ -1038,14 +2296,14 @@ class N8NWorkflowGenerator:
                 "generated_by": "Multi-Agent AI System"
             },
             "data_summary": {
-                "total_records": len(self.raw_data),
+                "total_records": int(totals['count']),
                 "date_range": {
-                    "start": str(self.raw_data['date'].min().date()),
-                    "end": str(self.raw_data['date'].max().date())
+                    "start": str(first_day.date()),
+                    "end": str(last_day.date())
                 },
-                "total_revenue": float(self.raw_data['revenue'].sum()),
-                "total_profit": float(self.raw_data['profit'].sum()),
-                "avg_profit_margin": float(self.raw_data['profit_margin'].mean()),
+                "total_revenue": float(totals['revenue']),
+                "total_profit": float(totals['profit']),
+                "avg_profit_margin": float(totals['margin_sum'] / totals['count']),
                 "currency": "BDT (৳)"
             },
             "analytics_results": {
@@ -1199,7 +2457,8 @@ n8n_generator = N8NWorkflowGenerator(
     diagnostic_analysis,
     predictive_analysis,
     prescriptive_analysis,
-    sales_data
+    sales_data,
+    sales_cube
 )
 
 # Auto-generate both files
@@ -1281,7 +2540,7 @@ print("\n" + "="*80)
 print("✅ ALL SECTIONS COMPLETE!")
 print("="*80)
 print(f"\n📈 Generated Deliverables:")
-print(f"   1. Sales Data: akij_sales_data_complete.csv")
+print(f"   1. Sales Data: akij_sales_data_complete.csv + {sales_store.root}/ (Parquet)")
 print(f"   2. n8n Workflow: {workflow_filename}")
 print(f"   3. Complete Analytics: All 4 agents executed")
 print(f"\n🎯 System Ready for Production Deployment!")
@@ -5,7 +5,8 @@
 # Generates synthetic sales data, runs 4 analytics agents, and exports n8n payload + workflow.
 
 from datetime import datetime, timedelta
-import json, os
+from concurrent.futures import ThreadPoolExecutor
+import json, os, time
 import numpy as np
 import pandas as pd
 
@@ -147,12 +148,31 @@ class N8NWorkflowGenerator:
 # -------------------------
 # Runner
 # -------------------------
+def _timed(agent_cls, df):
+    t0=time.perf_counter(); result=agent_cls(df).analyze()
+    return result, time.perf_counter()-t0
+
+def run_agents(df, max_workers=3):
+    # Descriptive/Diagnostic/Predictive are independent reads of df: fan out, then join for Prescriptive
+    t0=time.perf_counter(); timings={}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures={name:pool.submit(_timed,cls,df) for name,cls in
+                 [('descriptive',DescriptiveAgent),('diagnostic',DiagnosticAgent),('predictive',PredictiveAgent)]}
+        results={}
+        for name,fut in futures.items(): results[name],timings[name]=fut.result()
+    t1=time.perf_counter()
+    results['prescriptive']=PrescriptiveAgent(results['descriptive'],results['diagnostic'],results['predictive']).analyze()
+    timings['prescriptive']=time.perf_counter()-t1
+    timings['total']=time.perf_counter()-t0
+    return results, timings
+
 def main(n=4000):
     print("Generating data...")
     df=generate_sales_data(n); df.to_csv('akij_sales_data_complete.csv',index=False)
     print("Data generated:",len(df))
-    desc, diag, pred = DescriptiveAgent(df).analyze(), DiagnosticAgent(df).analyze(), PredictiveAgent(df).analyze()
-    presc=PrescriptiveAgent(desc,diag,pred).analyze()
+    results, timings = run_agents(df)
+    desc, diag, pred, presc = (results[k] for k in ('descriptive','diagnostic','predictive','prescriptive'))
+    print("Agent wall times (ms):",", ".join(f"{k}={v*1000:.1f}" for k,v in timings.items()))
     gen=N8NWorkflowGenerator(desc,diag,pred,presc,df)
     gen.auto_generate()
     print("All tasks complete. Ready for n8n import!")
@@ -29,8 +29,13 @@ print("="*80)
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, TypedDict, Annotated
+from typing import Dict, List, Any, TypedDict, Annotated, Tuple
+import asyncio
+import hashlib
 import json
+import sqlite3
+import threading
+import time
 import warnings
 import os
 warnings.filterwarnings('ignore')
@@ -39,8 +44,9 @@ warnings.filterwarnings('ignore')
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolExecutor
 from operator import add
 
@@ -162,14 +168,150 @@ class AgentState(TypedDict):
     final_report: str
     next_agent: str
 
+class LLMResponseCache:
+    """
+    Persistent, content-addressed cache of parsed LLM responses (SQLite on local disk).
+    Entries are keyed by sha256(model, temperature, rendered prompt), so an unchanged
+    prompt costs zero model calls. Least-recently-used entries are evicted once the
+    stored responses exceed max_bytes; entries older than ttl_seconds (if set) are misses.
+    """
+    
+    _default = None
+    
+    def __init__(self, path: str = "akij_llm_cache.sqlite", max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+    
+    @classmethod
+    def default(cls) -> "LLMResponseCache":
+        """Process-wide cache shared by agents that are not given one explicitly"""
+        if cls._default is None:
+            cls._default = cls(os.getenv("AKIJ_LLM_CACHE", "akij_llm_cache.sqlite"))
+        return cls._default
+    
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str) -> str:
+        payload = json.dumps([model, temperature, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Any:
+        """Cached response for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+    
+    def put(self, key: str, value: Any) -> None:
+        """Store a response and evict least-recently-used entries beyond max_bytes"""
+        encoded = json.dumps(value, ensure_ascii=False, default=str)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded.encode("utf-8")), now, now))
+            self._conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS running
+                        FROM responses)
+                    WHERE running > ?)""", (self.max_bytes,))
+            self._conn.commit()
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+class AnalyticsAgentBase:
+    """
+    Shared LLM call path for the analytics agents.
+    Subclasses build (prompt inputs, fallback analysis) in _prepare(); analyze() and
+    aanalyze() run the chain synchronously or asynchronously and fall back on failure.
+    Successful responses are stored in the agent's LLMResponseCache; fallbacks never are.
+    """
+    
+    running_message = ""
+    complete_message = ""
+    cache: LLMResponseCache = None
+    
+    def _cache_key(self, inputs: Dict[str, Any]) -> str:
+        model = getattr(self.llm, "model_name", None) or getattr(self.llm, "model", "")
+        temperature = getattr(self.llm, "temperature", None)
+        return LLMResponseCache.make_key(model, temperature, self.prompt.format(**inputs))
+    
+    def _run(self, inputs: Dict[str, Any], fallback: Dict[str, Any]) -> Dict[str, Any]:
+        print(self.running_message)
+        key = self._cache_key(inputs) if self.cache is not None else None
+        analysis = self.cache.get(key) if key else None
+        if analysis is None:
+            try:
+                analysis = self.chain.invoke(inputs)
+                if key:
+                    self.cache.put(key, analysis)
+            except:
+                analysis = fallback
+        print(self.complete_message)
+        return analysis
+    
+    async def _arun(self, inputs: Dict[str, Any], fallback: Dict[str, Any]) -> Dict[str, Any]:
+        print(self.running_message)
+        key = self._cache_key(inputs) if self.cache is not None else None
+        analysis = self.cache.get(key) if key else None
+        if analysis is None:
+            try:
+                analysis = await self.chain.ainvoke(inputs)
+                if key:
+                    self.cache.put(key, analysis)
+            except:
+                analysis = fallback
+        print(self.complete_message)
+        return analysis
+
 # =============================================================================
 # SECTION 4: AGENT 1 - DESCRIPTIVE ANALYTICS (LangChain Version)
 # =============================================================================
 
-class DescriptiveAnalyticsAgent:
+class DescriptiveAnalyticsAgent(AnalyticsAgentBase):
     """LangChain-powered Descriptive Analytics Agent"""
     
-    def __init__(self, llm: ChatOpenAI = None):
+    running_message = "📊 AGENT 1: Descriptive Analytics Running..."
+    complete_message = "✅ Descriptive analysis complete\n"
+    
+    def __init__(self, llm: ChatOpenAI = None, cache: LLMResponseCache = None):
         self.llm = llm or ChatOpenAI(
             model="gpt-4o-mini",
             temperature=0.2,
@@ -191,11 +333,17 @@ class DescriptiveAnalyticsAgent:
         ])
         
         self.chain = self.prompt | self.llm | JsonOutputParser()
+        self.cache = cache if cache is not None else LLMResponseCache.default()
     
     def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Perform descriptive analysis"""
-        print("📊 AGENT 1: Descriptive Analytics Running...")
-        
+        return self._run(*self._prepare(data))
+    
+    async def aanalyze(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Perform descriptive analysis without blocking the event loop"""
+        return await self._arun(*self._prepare(data))
+    
+    def _prepare(self, data: pd.DataFrame) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         # Calculate metrics
         total_revenue = float(data['revenue'].sum())
         total_profit = float(data['profit'].sum())
@@ -220,31 +368,28 @@ class DescriptiveAnalyticsAgent:
         Date Range: {data['date'].min().date()} to {data['date'].max().date()}
         """
         
-        # Use LLM to generate insights
-        try:
-            analysis = self.chain.invoke({"data_summary": data_summary})
-        except:
-            # Fallback if LLM fails
-            analysis = {
-                "agent_name": "Descriptive Analytics Agent",
-                "total_revenue": total_revenue,
-                "total_profit": total_profit,
-                "avg_margin": avg_margin,
-                "top_division": top_division,
-                "insights": "Manual analysis completed"
-            }
-        
-        print("✅ Descriptive analysis complete\n")
-        return analysis
+        # Fallback if LLM fails
+        fallback = {
+            "agent_name": "Descriptive Analytics Agent",
+            "total_revenue": total_revenue,
+            "total_profit": total_profit,
+            "avg_margin": avg_margin,
+            "top_division": top_division,
+            "insights": "Manual analysis completed"
+        }
+        return {"data_summary": data_summary}, fallback
 
 # =============================================================================
 # SECTION 5: AGENT 2 - DIAGNOSTIC ANALYTICS (LangChain Version)
 # =============================================================================
 
-class DiagnosticAnalyticsAgent:
+class DiagnosticAnalyticsAgent(AnalyticsAgentBase):
     """LangChain-powered Diagnostic Analytics Agent"""
     
-    def __init__(self, llm: ChatOpenAI = None):
+    running_message = "🔍 AGENT 2: Diagnostic Analytics Running..."
+    complete_message = "✅ Diagnostic analysis complete\n"
+    
+    def __init__(self, llm: ChatOpenAI = None, cache: LLMResponseCache = None):
         self.llm = llm or ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
         
         self.prompt = ChatPromptTemplate.from_messages([
@@ -263,11 +408,17 @@ class DiagnosticAnalyticsAgent:
         ])
         
         self.chain = self.prompt | self.llm | JsonOutputParser()
+        self.cache = cache if cache is not None else LLMResponseCache.default()
     
     def analyze(self, data: pd.DataFrame, descriptive: Dict) -> Dict[str, Any]:
         """Perform diagnostic analysis"""
-        print("🔍 AGENT 2: Diagnostic Analytics Running...")
-        
+        return self._run(*self._prepare(data, descriptive))
+    
+    async def aanalyze(self, data: pd.DataFrame, descriptive: Dict) -> Dict[str, Any]:
+        """Perform diagnostic analysis without blocking the event loop"""
+        return await self._arun(*self._prepare(data, descriptive))
+    
+    def _prepare(self, data: pd.DataFrame, descriptive: Dict) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         # Calculate diagnostics
         overall_margin = data['profit_margin'].mean()
         division_margins = data.groupby('business_division')['profit_margin'].mean()
@@ -288,26 +439,24 @@ class DiagnosticAnalyticsAgent:
         Channel Efficiency: {channel_efficiency}
         """
         
-        try:
-            analysis = self.chain.invoke({"analysis_context": context})
-        except:
-            analysis = {
-                "agent_name": "Diagnostic Analytics Agent",
-                "underperformers": underperformers,
-                "key_findings": "Performance gaps identified"
-            }
-        
-        print("✅ Diagnostic analysis complete\n")
-        return analysis
+        fallback = {
+            "agent_name": "Diagnostic Analytics Agent",
+            "underperformers": underperformers,
+            "key_findings": "Performance gaps identified"
+        }
+        return {"analysis_context": context}, fallback
 
 # =============================================================================
 # SECTION 6: AGENT 3 - PREDICTIVE ANALYTICS (LangChain Version)
 # =============================================================================
 
-class PredictiveAnalyticsAgent:
+class PredictiveAnalyticsAgent(AnalyticsAgentBase):
     """LangChain-powered Predictive Analytics Agent"""
     
-    def __init__(self, llm: ChatOpenAI = None):
+    running_message = "🔮 AGENT 3: Predictive Analytics Running..."
+    complete_message = "✅ Predictive analysis complete\n"
+    
+    def __init__(self, llm: ChatOpenAI = None, cache: LLMResponseCache = None):
         self.llm = llm or ChatOpenAI(model="gpt-4o-mini", temperature=0.1)
         
         self.prompt = ChatPromptTemplate.from_messages([
@@ -325,11 +474,17 @@ class PredictiveAnalyticsAgent:
         ])
         
         self.chain = self.prompt | self.llm | JsonOutputParser()
+        self.cache = cache if cache is not None else LLMResponseCache.default()
     
     def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Perform predictive analysis"""
-        print("🔮 AGENT 3: Predictive Analytics Running...")
-        
+        return self._run(*self._prepare(data))
+    
+    async def aanalyze(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Perform predictive analysis without blocking the event loop"""
+        return await self._arun(*self._prepare(data))
+    
+    def _prepare(self, data: pd.DataFrame) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         # Calculate growth
         recent = data.tail(300)['revenue'].mean()
         previous = data.tail(600).head(300)['revenue'].mean()
@@ -345,27 +500,25 @@ class PredictiveAnalyticsAgent:
         30-day Forecast: ৳{forecast_revenue:,.2f}
         """
         
-        try:
-            analysis = self.chain.invoke({"forecast_data": forecast_data})
-        except:
-            analysis = {
-                "agent_name": "Predictive Analytics Agent",
-                "forecast_revenue": forecast_revenue,
-                "growth_rate": growth_rate,
-                "trend": "Growing" if growth_rate > 0 else "Declining"
-            }
-        
-        print("✅ Predictive analysis complete\n")
-        return analysis
+        fallback = {
+            "agent_name": "Predictive Analytics Agent",
+            "forecast_revenue": forecast_revenue,
+            "growth_rate": growth_rate,
+            "trend": "Growing" if growth_rate > 0 else "Declining"
+        }
+        return {"forecast_data": forecast_data}, fallback
 
 # =============================================================================
 # SECTION 7: AGENT 4 - PRESCRIPTIVE ANALYTICS (LangChain Version)
 # =============================================================================
 
-class PrescriptiveAnalyticsAgent:
+class PrescriptiveAnalyticsAgent(AnalyticsAgentBase):
     """LangChain-powered Prescriptive Analytics Agent"""
     
-    def __init__(self, llm: ChatOpenAI = None):
+    running_message = "⚡ AGENT 4: Prescriptive Analytics Running..."
+    complete_message = "✅ Prescriptive analysis complete\n"
+    
+    def __init__(self, llm: ChatOpenAI = None, cache: LLMResponseCache = None):
         self.llm = llm or ChatOpenAI(model="gpt-4o-mini", temperature=0.4)
         
         self.prompt = ChatPromptTemplate.from_messages([
@@ -383,93 +536,116 @@ class PrescriptiveAnalyticsAgent:
         ])
         
         self.chain = self.prompt | self.llm | JsonOutputParser()
+        self.cache = cache if cache is not None else LLMResponseCache.default()
     
     def analyze(self, descriptive: Dict, diagnostic: Dict, predictive: Dict) -> Dict[str, Any]:
         """Generate prescriptive recommendations"""
-        print("⚡ AGENT 4: Prescriptive Analytics Running...")
-        
+        return self._run(*self._prepare(descriptive, diagnostic, predictive))
+    
+    async def aanalyze(self, descriptive: Dict, diagnostic: Dict, predictive: Dict) -> Dict[str, Any]:
+        """Generate prescriptive recommendations without blocking the event loop"""
+        return await self._arun(*self._prepare(descriptive, diagnostic, predictive))
+    
+    def _prepare(self, descriptive: Dict, diagnostic: Dict,
+                 predictive: Dict) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         all_analyses = f"""
         DESCRIPTIVE: {json.dumps(descriptive, default=str)[:300]}
         DIAGNOSTIC: {json.dumps(diagnostic, default=str)[:300]}
         PREDICTIVE: {json.dumps(predictive, default=str)[:300]}
         """
         
-        try:
-            analysis = self.chain.invoke({"all_analyses": all_analyses})
-        except:
-            analysis = {
-                "agent_name": "Prescriptive Analytics Agent",
-                "immediate_actions": [
-                    "Optimize underperforming divisions",
-                    "Expand high-growth products"
-                ],
-                "strategic_initiatives": [
-                    "Digital transformation",
-                    "Regional expansion"
-                ]
-            }
-        
-        print("✅ Prescriptive analysis complete\n")
-        return analysis
+        fallback = {
+            "agent_name": "Prescriptive Analytics Agent",
+            "immediate_actions": [
+                "Optimize underperforming divisions",
+                "Expand high-growth products"
+            ],
+            "strategic_initiatives": [
+                "Digital transformation",
+                "Regional expansion"
+            ]
+        }
+        return {"all_analyses": all_analyses}, fallback
 
 # =============================================================================
 # SECTION 8: LANGGRAPH ORCHESTRATION
 # =============================================================================
 
-def create_agent_graph(sales_data: pd.DataFrame):
-    """Create LangGraph workflow orchestrating all agents"""
+def create_agent_graph(sales_data: pd.DataFrame, cache: LLMResponseCache = None):
+    """
+    Create LangGraph workflow orchestrating all agents.
+    
+    Only diagnostic depends on another agent (it reads descriptive_analysis), so the graph
+    fans out from START: descriptive and predictive run concurrently, diagnostic starts as
+    soon as descriptive finishes, and prescriptive joins on diagnostic + predictive.
+    Each node returns only the keys it writes so parallel branches merge cleanly.
+    Every node has a sync and an async body: invoke() runs branches on LangGraph's thread
+    pool, ainvoke() overlaps the LLM calls on the event loop.
+    """
     
     # Initialize agents
-    desc_agent = DescriptiveAnalyticsAgent()
-    diag_agent = DiagnosticAnalyticsAgent()
-    pred_agent = PredictiveAnalyticsAgent()
-    presc_agent = PrescriptiveAnalyticsAgent()
+    desc_agent = DescriptiveAnalyticsAgent(cache=cache)
+    diag_agent = DiagnosticAnalyticsAgent(cache=cache)
+    pred_agent = PredictiveAnalyticsAgent(cache=cache)
+    presc_agent = PrescriptiveAnalyticsAgent(cache=cache)
     
     # Define agent nodes
-    def descriptive_node(state: AgentState) -> AgentState:
-        analysis = desc_agent.analyze(state["sales_data"])
-        state["descriptive_analysis"] = analysis
-        state["next_agent"] = "diagnostic"
-        return state
+    def descriptive_node(state: AgentState) -> Dict[str, Any]:
+        return {"descriptive_analysis": desc_agent.analyze(state["sales_data"])}
     
-    def diagnostic_node(state: AgentState) -> AgentState:
+    async def adescriptive_node(state: AgentState) -> Dict[str, Any]:
+        return {"descriptive_analysis": await desc_agent.aanalyze(state["sales_data"])}
+    
+    def diagnostic_node(state: AgentState) -> Dict[str, Any]:
         analysis = diag_agent.analyze(state["sales_data"], state["descriptive_analysis"])
-        state["diagnostic_analysis"] = analysis
-        state["next_agent"] = "predictive"
-        return state
+        return {"diagnostic_analysis": analysis}
+    
+    async def adiagnostic_node(state: AgentState) -> Dict[str, Any]:
+        analysis = await diag_agent.aanalyze(state["sales_data"], state["descriptive_analysis"])
+        return {"diagnostic_analysis": analysis}
+    
+    def predictive_node(state: AgentState) -> Dict[str, Any]:
+        return {"predictive_analysis": pred_agent.analyze(state["sales_data"])}
     
-    def predictive_node(state: AgentState) -> AgentState:
-        analysis = pred_agent.analyze(state["sales_data"])
-        state["predictive_analysis"] = analysis
-        state["next_agent"] = "prescriptive"
-        return state
+    async def apredictive_node(state: AgentState) -> Dict[str, Any]:
+        return {"predictive_analysis": await pred_agent.aanalyze(state["sales_data"])}
     
-    def prescriptive_node(state: AgentState) -> AgentState:
+    def prescriptive_node(state: AgentState) -> Dict[str, Any]:
         analysis = presc_agent.analyze(
             state["descriptive_analysis"],
             state["diagnostic_analysis"],
             state["predictive_analysis"]
         )
-        state["prescriptive_analysis"] = analysis
-        state["next_agent"] = "end"
-        return state
+        return {"prescriptive_analysis": analysis, "next_agent": "end"}
+    
+    async def aprescriptive_node(state: AgentState) -> Dict[str, Any]:
+        analysis = await presc_agent.aanalyze(
+            state["descriptive_analysis"],
+            state["diagnostic_analysis"],
+            state["predictive_analysis"]
+        )
+        return {"prescriptive_analysis": analysis, "next_agent": "end"}
     
     # Build graph
     workflow = StateGraph(AgentState)
     
-    workflow.add_node("descriptive", descriptive_node)
-    workflow.add_node("diagnostic", diagnostic_node)
-    workflow.add_node("predictive", predictive_node)
-    workflow.add_node("prescriptive", prescriptive_node)
+    workflow.add_node("descriptive", RunnableLambda(descriptive_node, afunc=adescriptive_node))
+    workflow.add_node("diagnostic", RunnableLambda(diagnostic_node, afunc=adiagnostic_node))
+    workflow.add_node("predictive", RunnableLambda(predictive_node, afunc=apredictive_node))
+    workflow.add_node("prescriptive", RunnableLambda(prescriptive_node, afunc=aprescriptive_node))
     
-    workflow.set_entry_point("descriptive")
+    workflow.add_edge(START, "descriptive")
+    workflow.add_edge(START, "predictive")
     workflow.add_edge("descriptive", "diagnostic")
-    workflow.add_edge("diagnostic", "predictive")
-    workflow.add_edge("predictive", "prescriptive")
+    workflow.add_edge(["diagnostic", "predictive"], "prescriptive")
     workflow.add_edge("prescriptive", END)
     
     return workflow.compile()
 
+async def run_agent_graph_async(agent_graph, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the graph with ainvoke; latency is roughly the longest branch, not the sum"""
+    return await agent_graph.ainvoke(state)
+
 # =============================================================================
 # SECTION 9: EXECUTE MULTI-AGENT SYSTEM
 # =============================================================================
@@ -493,8 +669,17 @@ initial_state = {
     "next_agent": "descriptive"
 }
 
-# Execute the workflow
-result = agent_graph.invoke(initial_state)
+# Execute the workflow (async when no event loop is running; Jupyter can `await` it directly)
+graph_start = time.perf_counter()
+try:
+    asyncio.get_running_loop()
+    result = agent_graph.invoke(initial_state)
+except RuntimeError:
+    result = asyncio.run(run_agent_graph_async(agent_graph, initial_state))
+print(f"⏱️ Agent graph completed in {time.perf_counter() - graph_start:.2f}s")
+cache_stats = LLMResponseCache.default().stats()
+print(f"🗄️ LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+      f"({cache_stats['entries']} entries, {cache_stats['bytes']:,} bytes)")
 
 print("\n" + "="*80)
 print("✅ ALL AGENTS COMPLETED SUCCESSFULLY")
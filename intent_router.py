@@ -0,0 +1,319 @@
+"""
+=============================================================================
+AKIJ RESOURCE - COMPILED INTENT ROUTER
+Keyword/regex routing table for the sales chatbot (chatbot_ui.process_query)
+Author: Abdul Matin
+Organization: Akij Resource
+=============================================================================
+
+Intents are registered in precedence order with trigger keywords, optional
+"also requires" keywords, an optional precompiled regex and a parameter
+extractor. All keywords are compiled into one Aho-Corasick automaton, so a
+query is scanned once no matter how many intents exist; only the intents
+whose keywords actually occur are then checked, in precedence order.
+Answers can be memoized in an AnswerCache keyed on (intent, params,
+dataset fingerprint).
+
+SALES_INTENTS is the sales chatbot's keyword table; chatbot_ui routes on it
+and docs/chatbot_ui_llm.py retrieves the matching metric tables with it.
+
+Benchmark:  python intent_router.py
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton compiled to a DFA: one dict lookup per character
+    finds every registered keyword occurring anywhere in the text
+    (same semantics as `keyword in text`, for all keywords at once).
+    """
+
+    def __init__(self, keywords):
+        goto, output = [{}], [set()]
+        for keyword in keywords:
+            node = 0
+            for ch in keyword:
+                if ch not in goto[node]:
+                    goto.append({})
+                    output.append(set())
+                    goto[node][ch] = len(goto) - 1
+                node = goto[node][ch]
+            output[node].add(keyword)
+
+        # Breadth-first: failure links, inherited outputs and full DFA transitions
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            delta[node] = {**delta[fail[node]], **goto[node]}
+            for ch, child in goto[node].items():
+                fail[child] = delta[fail[node]].get(ch, 0) if node else 0
+                output[child] |= output[fail[child]]
+                queue.append(child)
+
+        self._delta = delta
+        self._output = [frozenset(out) if out else None for out in output]
+
+    def find(self, text: str) -> set:
+        """All keywords that occur in text"""
+        delta, output = self._delta, self._output
+        node, found = 0, set()
+        for ch in text:
+            node = delta[node].get(ch, 0)
+            if output[node] is not None:
+                found |= output[node]
+        return found
+
+
+class IntentRoute:
+    """One routing-table entry"""
+
+    def __init__(self, name, handler, keywords=(), requires=(), pattern=None, params=None, on_match=None):
+        self.name = name
+        self.handler = handler
+        self.keywords = tuple(keywords)   # any of these triggers the route...
+        self.requires = frozenset(requires)  # ...if one of these also occurs (when given)
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.params = params               # (query, regex match) -> handler kwargs
+        self.on_match = on_match           # side effects (kwargs) -> None; runs even on cache hits
+
+    def accepts(self, query: str, hits: set):
+        """Regex match (or True) when the route applies to the query, else None"""
+        if self.requires and self.requires.isdisjoint(hits):
+            return None
+        if self.pattern is None:
+            return True
+        return self.pattern.search(query)
+
+    def extract(self, query: str, match) -> dict:
+        return self.params(query, match) if self.params else {}
+
+
+class AnswerCache:
+    """
+    Thread-safe LRU memo of intent answers keyed by (intent, params, dataset fingerprint).
+    An answer depends only on the data and its parsed parameters, so one instance can
+    serve every session; loading a new dataset version changes the fingerprint, and
+    prune() drops the superseded entries.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(intent: str, params: dict, fingerprint) -> tuple:
+        return intent, tuple(sorted(params.items())), fingerprint
+
+    def get_or_compute(self, key: tuple, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = compute()  # outside the lock: a concurrent duplicate compute is harmless
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def prune(self, stale) -> int:
+        """Drop entries whose fingerprint satisfies stale(fingerprint); returns the count"""
+        with self._lock:
+            keys = [key for key in self._entries if stale(key[2])]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class IntentRouter:
+    """
+    Pluggable intent router. Registration order is precedence order (first match
+    wins, like the if/elif chain it replaces); handlers receive the router's call
+    arguments plus the keyword arguments extracted by their route.
+    """
+
+    def __init__(self):
+        self._routes = []
+        self._fallback = None
+        self._automaton = None
+        self._triggers = {}
+
+    def register(self, name, handler, keywords=(), requires=(), pattern=None, params=None, on_match=None):
+        if not keywords:
+            raise ValueError(f"intent {name!r} needs at least one trigger keyword")
+        self._routes.append(IntentRoute(name, handler, keywords, requires, pattern, params, on_match))
+        self._automaton = None  # recompiled on next use
+        return handler
+
+    def intent(self, name, **route):
+        """Decorator form of register()"""
+        return lambda handler: self.register(name, handler, **route)
+
+    def fallback(self, handler):
+        """Handler for queries no intent accepts"""
+        self._fallback = handler
+        return handler
+
+    def compile(self):
+        self._triggers = {}
+        for index, route in enumerate(self._routes):
+            for keyword in route.keywords:
+                self._triggers.setdefault(keyword, []).append(index)
+        keywords = set(self._triggers)
+        for route in self._routes:
+            keywords |= route.requires
+        self._automaton = KeywordAutomaton(keywords)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return query.lower().strip()
+
+    def resolve(self, query: str):
+        """(route, kwargs) for the highest-precedence matching intent, or (None, {})"""
+        if self._automaton is None:
+            self.compile()
+        q = self.normalize(query)
+        hits = self._automaton.find(q)
+        candidates = sorted({index for keyword in hits for index in self._triggers.get(keyword, ())})
+        for index in candidates:
+            route = self._routes[index]
+            match = route.accepts(q, hits)
+            if match:
+                return route, route.extract(q, match)
+        return None, {}
+
+    def resolve_linear(self, query: str):
+        """Reference resolution by scanning every route in turn (what the if/elif chain did)"""
+        q = self.normalize(query)
+        for route in self._routes:
+            if not any(keyword in q for keyword in route.keywords):
+                continue
+            hits = {keyword for keyword in route.requires if keyword in q}
+            match = route.accepts(q, hits)
+            if match:
+                return route, route.extract(q, match)
+        return None, {}
+
+    def resolve_all(self, query: str) -> list:
+        """(route, kwargs) for every matching intent, in precedence order"""
+        if self._automaton is None:
+            self.compile()
+        q = self.normalize(query)
+        hits = self._automaton.find(q)
+        candidates = sorted({index for keyword in hits for index in self._triggers.get(keyword, ())})
+        resolved = []
+        for index in candidates:
+            route = self._routes[index]
+            match = route.accepts(q, hits)
+            if match:
+                resolved.append((route, route.extract(q, match)))
+        return resolved
+
+    def route(self, query: str, *args, cache: AnswerCache = None, fingerprint=None):
+        """
+        Dispatch query to its intent handler (or the fallback). With a cache, the
+        handler only runs on a miss for (intent, params, fingerprint).
+        """
+        route, params = self.resolve(query)
+        if route is None:
+            return self._fallback(*args) if self._fallback else None
+        if route.on_match:
+            route.on_match(**params)
+        if cache is None:
+            return route.handler(*args, **params)
+        return cache.get_or_compute(AnswerCache.key(route.name, params, fingerprint),
+                                    lambda: route.handler(*args, **params))
+
+    @property
+    def intents(self) -> list:
+        return [route.name for route in self._routes]
+
+
+# ----------------------------------------------------------------------
+# Sales chatbot intents (registration order = precedence)
+# ----------------------------------------------------------------------
+TOP_X_PATTERN = re.compile(r'top\s*(\d+)\s*products?')
+NEXT_DAYS_PATTERN = re.compile(r'next\s*(\d+)\s*day')
+DAYS_PATTERN = re.compile(r'(\d+)\s*day')
+
+
+def _top_x(q: str, match) -> dict:
+    return {'x': max(1, int(match.group(1)))}
+
+
+def _forecast_days(q: str, match) -> dict:
+    days_match = NEXT_DAYS_PATTERN.search(q) or DAYS_PATTERN.search(q)
+    return {'days': int(days_match.group(1)) if days_match else 30}
+
+
+SALES_INTENTS = {
+    'top_products': dict(keywords=['top'], pattern=TOP_X_PATTERN, params=_top_x),
+    'forecast': dict(keywords=['forecast', 'predict', 'next'], requires=['day'], params=_forecast_days),
+    'total_revenue': dict(keywords=['total revenue', 'overall sales', 'total sales']),
+    'division': dict(keywords=['division']),
+    'region': dict(keywords=['region']),
+    'profit_margin': dict(keywords=['profit', 'margin']),
+    'trend': dict(keywords=['trend', 'over time', 'growth']),
+    'segments': dict(keywords=['segment', 'customer']),
+    'summary': dict(keywords=['summary', 'overview', 'dashboard']),
+}
+
+
+def benchmark(router: IntentRouter, queries: list, repeat: int = 2000) -> dict:
+    """Mean dispatch-resolution time per query (µs), compiled vs linear scan"""
+    router.compile()
+    results = {}
+    for label, resolve in (("compiled", router.resolve), ("linear", router.resolve_linear)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                resolve(query)
+        results[label] = (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+    return results
+
+
+if __name__ == "__main__":
+    import random
+
+    rng = random.Random(42)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+                  for _ in range(5000)]
+    queries = [
+        "what is the total revenue for beverages this quarter",
+        "show me the top 7 products by revenue in dhaka",
+        "forecast next 15 days of sales for the cement division",
+        "how did customer segments perform over time",
+        "hello there",
+    ]
+
+    print("Intent router benchmark (µs per query, dispatch only)")
+    print(f"{'intents':>8} {'compiled':>10} {'linear':>10} {'agree':>6}")
+    for size in (10, 100, 1000):
+        router = IntentRouter()
+        for i in range(size):
+            router.register(f"intent_{i}", lambda: None, keywords=rng.sample(vocabulary, 3))
+        router.register("total_revenue", lambda: None, keywords=["total revenue"])
+        router.register("top_products", lambda: None, keywords=["top"], pattern=r"top\s*(\d+)\s*products?",
+                        params=lambda q, m: {"x": int(m.group(1))})
+        timings = benchmark(router, queries, repeat=200)
+        agree = all(router.resolve(q)[1] == router.resolve_linear(q)[1] and
+                    getattr(router.resolve(q)[0], "name", None) == getattr(router.resolve_linear(q)[0], "name", None)
+                    for q in queries)
+        print(f"{size:>8} {timings['compiled']:>10.2f} {timings['linear']:>10.2f} {str(agree):>6}")